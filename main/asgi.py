@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "main.settings")
 
 application = get_asgi_application()
+
+if settings.WORKER_WARMUP:
+    from posts.warmup import warmup
+
+    # Sync views run on executor threads that open their own connections.
+    warmup(open_connections=False)
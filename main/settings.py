@@ -48,6 +48,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "posts.db.ReadOnlyRequestMiddleware",
 ]
 
 ROOT_URLCONF = "main.urls"
@@ -83,9 +84,117 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+    },
+    "archive": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "archive.sqlite3",
+    },
+}
+
+# "production" tunes every SQLite connection with SQLITE_PRODUCTION_PRAGMAS and sends
+# the queries of read-only requests to a separate "read" connection.
+DATABASE_PROFILE = os.getenv("DATABASE_PROFILE", "development")
+
+SQLITE_PRODUCTION_PRAGMAS = {
+    "journal_mode": "WAL",
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,
+    "temp_store": "MEMORY",
+}
+# BEGIN IMMEDIATE takes the write lock up front, so a transaction that reads before it
+# writes waits on busy_timeout instead of failing with "database is locked" on upgrade.
+SQLITE_PRODUCTION_TRANSACTION_MODE = "IMMEDIATE"
+SQLITE_PRAGMAS = {}
+
+if DATABASE_PROFILE == "production":
+    SQLITE_PRAGMAS = SQLITE_PRODUCTION_PRAGMAS
+    DATABASES["default"]["OPTIONS"] = {"transaction_mode": SQLITE_PRODUCTION_TRANSACTION_MODE}
+    DATABASES["read"] = {
+        **DATABASES["default"],
+        "OPTIONS": {},
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Number of databases Comment rows are sharded across by post_id; 0 keeps them in "default"
+COMMENT_SHARDS = int(os.getenv("COMMENT_SHARDS", 0))
+COMMENT_SHARD_ALIASES = [f"comments_{shard}" for shard in range(COMMENT_SHARDS)]
+# Size of the comment id range reserved for each shard, see posts.db.reserve_comment_shard_ids
+COMMENT_SHARD_ID_SPAN = 10**9
+
+for alias in COMMENT_SHARD_ALIASES:
+    DATABASES[alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / f"{alias}.sqlite3",
+        "OPTIONS": DATABASES["default"].get("OPTIONS", {}),
+    }
+
+DATABASE_ROUTERS = ["posts.db.ArchiveRouter", "posts.db.ReadReplicaRouter", "posts.db.CommentShardRouter"]
+
+# Comments older than this are moved to the archive database by `manage.py archive_comments`
+COMMENT_RETENTION_DAYS = int(os.getenv("COMMENT_RETENTION_DAYS", 365))
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+# Shared by every worker process, so an update made by one worker (feed timeline, spam
+# fingerprints, auto-reply contexts) is seen by all. Create the table with
+# `manage.py createcachetable`.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "django_cache",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
     }
 }
 
+# Number of most recent posts kept in the cached cross-author feed timeline, and how
+# long the cached timeline lives before it is rebuilt from the database
+FEED_TIMELINE_SIZE = int(os.getenv("FEED_TIMELINE_SIZE", 1000))
+FEED_TIMELINE_CACHE_SECONDS = 60
+
+# Full-text search index used by GET /posts/search, see posts.search.SearchBackend
+SEARCH_BACKEND = "posts.search.SqliteFTSBackend"
+
+# Most posts GET /posts/batch returns in one request
+POST_BATCH_MAX_IDS = 100
+
+# Auto-reply prompts embed posts longer than AUTO_REPLY_POST_CONTEXT_CHARS as a summary
+# ("summarize") or a truncation ("truncate"); contexts and replies are cached, see posts.utils
+AUTO_REPLY_POST_CONTEXT_CHARS = int(os.getenv("AUTO_REPLY_POST_CONTEXT_CHARS", 2000))
+AUTO_REPLY_POST_CONTEXT_MODE = os.getenv("AUTO_REPLY_POST_CONTEXT_MODE", "summarize")
+AUTO_REPLY_CACHE_SECONDS = 7 * 24 * 3600
+
+# Server-Sent Events stream of new comments, see posts.events
+COMMENT_STREAM_POLL_SECONDS = 2
+COMMENT_STREAM_KEEPALIVE_SECONDS = 15
+COMMENT_STREAM_BUFFER_SIZE = 100
+
+# Near-duplicate spam detection in add_comment, see posts.spam. SPAM_MAX_DISTANCE must stay
+# below posts.fingerprint.BAND_COUNT for the LSH bands to find every near-duplicate.
+SPAM_MAX_DISTANCE = 7
+SPAM_BLOCKED_WINDOW_HOURS = 24
+SPAM_BURST_WINDOW_SECONDS = 60
+SPAM_BURST_LIMIT = 3
+
+# Idempotency-Key support on create_post and add_comment, see posts.idempotency. Keys are
+# replayable for the TTL; an in-flight key is taken over after the lock timeout.
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+IDEMPOTENCY_LOCK_SECONDS = 300
+
+# Outbox of post/comment events and the sinks relay_outbox can deliver them to, see posts.outbox
+OUTBOX_SINKS = {
+    "file": "posts.outbox.FileSink",
+    "http": "posts.outbox.HttpSink",
+}
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", 7))
+
+# Comments deleted per transaction when purging a soft-deleted post
+PURGE_CHUNK_SIZE = int(os.getenv("PURGE_CHUNK_SIZE", 500))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -106,6 +215,43 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing profile. The first hasher of a profile hashes new passwords; the others
+# only verify existing hashes, which are upgraded on the next login. "argon2" needs argon2-cffi.
+# Pick a profile and PASSWORD_PBKDF2_ITERATIONS with `manage.py benchmark_password_hashers`.
+_FALLBACK_PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+PASSWORD_HASHER_PROFILES = {
+    "pbkdf2": [
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.Argon2PasswordHasher",
+        "django.contrib.auth.hashers.ScryptPasswordHasher",
+        *_FALLBACK_PASSWORD_HASHERS,
+    ],
+    "pbkdf2-tuned": [
+        "users.hashers.TunedPBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.Argon2PasswordHasher",
+        "django.contrib.auth.hashers.ScryptPasswordHasher",
+        *_FALLBACK_PASSWORD_HASHERS,
+    ],
+    "scrypt": [
+        "django.contrib.auth.hashers.ScryptPasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.Argon2PasswordHasher",
+        *_FALLBACK_PASSWORD_HASHERS,
+    ],
+    "argon2": [
+        "django.contrib.auth.hashers.Argon2PasswordHasher",
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.ScryptPasswordHasher",
+        *_FALLBACK_PASSWORD_HASHERS,
+    ],
+}
+PASSWORD_HASHER_PROFILE = os.getenv("PASSWORD_HASHER_PROFILE", "pbkdf2")
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", 600000))
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -128,6 +274,9 @@ STATIC_URL = "static/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Create the model client and open database connections when a worker boots, see posts.warmup
+WORKER_WARMUP = bool(os.getenv("WORKER_WARMUP"))
+
 VERTEXAI_PROJECT_ID = os.getenv("VERTEXAI_PROJECT_ID")
 VERTEXAI_LOCATION = "us-central1"
 VERTEXAI_MODEL_NAME = "gemini-1.5-flash-002"
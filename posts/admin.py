@@ -1,23 +1,176 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.db.models.functions import Substr
+from django.utils.functional import cached_property
 
+from .counters import (
+    decrement_comment_counters,
+    increment_comment_counters,
+    reconcile_post_counters,
+    set_comment_blocked,
+)
 from .models import Comment, Post
+from .search import get_search_backend
 
 
-class PostAdmin(admin.ModelAdmin):
+class CountLowerBound(int):
+    """
+    A row count that stopped early: paginates like the number, renders as "N+".
+    """
+
+    def __str__(self):
+        return f"{int(self)}+"
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Avoids an exact COUNT(*) over the whole table on every changelist page:
+    unfiltered lists (only the default manager's own filter) use the highest id as
+    the row estimate, filtered ones count at most count_limit rows past the current
+    page, so the following pages stay reachable however long the list is.
+    """
+
+    count_limit = 10000
+
+    def __init__(self, *args, page_number=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_number = page_number
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        model = queryset.model
+        if queryset.query.where == model._default_manager.all().query.where:
+            return model._base_manager.aggregate(estimate=Max("pk"))["estimate"] or 0
+        limit = self.page_number * self.per_page + self.count_limit
+        count = queryset[:limit].count()
+        return CountLowerBound(count) if count == limit else count
+
+
+class ExcerptChangeList(ChangeList):
+    """
+    Loads the first characters of the content column instead of the whole text,
+    and no text columns of the related rows.
+    """
+
+    def get_queryset(self, request, exclude_parameters=None):
+        queryset = super().get_queryset(request, exclude_parameters)
+        length = self.model_admin.content_excerpt_length
+        return queryset.defer(*self.model_admin.changelist_deferred_fields).annotate(
+            content_excerpt=Substr("content", 1, length + 1)
+        )
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables too large to count, scan or render in full.
+    Searches go through the full-text index instead of LIKE over every row, and dates
+    are filtered with fixed ranges: a date_hierarchy would collect the distinct
+    truncated dates of the whole table on every page.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    content_excerpt_length = 80
+    changelist_deferred_fields = ["content"]
+    search_limit = 1000
+    search_hit_type = None
+
+    def get_changelist(self, request, **kwargs):
+        return ExcerptChangeList
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            page_number = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page_number = 1
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, page_number=page_number)
+
+    @admin.display(description="content")
+    def content_excerpt(self, obj):
+        excerpt = getattr(obj, "content_excerpt", None) or obj.content
+        if len(excerpt) > self.content_excerpt_length:
+            return excerpt[: self.content_excerpt_length] + "..."
+        return excerpt
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        hits, _ = get_search_backend().search(
+            search_term, self.search_limit, hit_type=self.search_hit_type, include_blocked=True
+        )
+        ids = [hit["id"] for hit in hits]
+        return queryset.filter(id__in=ids), False
+
+
+class PostAdmin(LargeTableAdmin):
     list_display = [
         "author",
         "title",
-        "content",
+        "content_excerpt",
         "created_at",
         "auto_reply_enabled",
         "reply_delay_minutes",
+        "comment_count",
+        "blocked_count",
     ]
+    list_select_related = ["author"]
+    list_filter = [("created_at", admin.DateFieldListFilter)]
     search_fields = ["title"]
+    search_hit_type = "post"
+    readonly_fields = ["comment_count", "blocked_count", "last_comment_at"]
 
 
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ["post", "author", "content", "created_at", "blocked"]
+class CommentAdmin(LargeTableAdmin):
+    list_display = ["post", "author", "content_excerpt", "created_at", "blocked"]
+    list_select_related = ["post", "author"]
+    changelist_deferred_fields = ["content", "post__content"]
+    list_filter = ["blocked", ("created_at", admin.DateFieldListFilter)]
     search_fields = ["content"]
+    search_hit_type = "comment"
+    actions = ["block_comments", "unblock_comments"]
+
+    def save_model(self, request, obj, form, change):
+        blocked = obj.blocked
+        if change and "blocked" in form.changed_data:
+            obj.blocked = form.initial["blocked"]
+        super().save_model(request, obj, form, change)
+        if change:
+            set_comment_blocked(obj, blocked)
+        else:
+            increment_comment_counters(obj)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        decrement_comment_counters(obj)
+
+    def delete_queryset(self, request, queryset):
+        post_ids = set(queryset.values_list("post_id", flat=True))
+        super().delete_queryset(request, queryset)
+        reconcile_post_counters(Post.objects.filter(id__in=post_ids))
+
+    def _set_blocked(self, request, queryset, blocked):
+        # One UPDATE for the whole selection, then repair the counters of the touched posts.
+        changed = queryset.filter(blocked=not blocked)
+        post_ids = set(changed.order_by().values_list("post_id", flat=True).distinct())
+        updated = changed.update(blocked=blocked)
+        reconcile_post_counters(Post.all_objects.filter(id__in=post_ids))
+
+        backend = get_search_backend()
+        selected = Comment.objects.filter(pk__in=queryset.values("pk"), blocked=blocked)
+        for comment in selected.only("id", "post_id", "content", "blocked").iterator():
+            backend.index_comment(comment)
+        self.message_user(request, f"{'Blocked' if blocked else 'Unblocked'} {updated} comment(s).")
+
+    @admin.action(description="Block selected comments")
+    def block_comments(self, request, queryset):
+        self._set_blocked(request, queryset, True)
+
+    @admin.action(description="Unblock selected comments")
+    def unblock_comments(self, request, queryset):
+        self._set_blocked(request, queryset, False)
 
 
 admin.site.register(Post, PostAdmin)
@@ -1,6 +1,4 @@
 from django.conf import settings
-from vertexai import init as vertexai_init
-from vertexai.generative_models import GenerativeModel
 
 _model = None
 
@@ -8,6 +6,11 @@ _model = None
 def get_model():
     global _model
     if not _model:
+        # The SDK is imported on first use: it is slow to import and most processes
+        # (management commands, tests, workers not serving moderation) never need it.
+        from vertexai import init as vertexai_init
+        from vertexai.generative_models import GenerativeModel
+
         vertexai_init(project=settings.VERTEXAI_PROJECT_ID, location=settings.VERTEXAI_LOCATION)
 
         _model = GenerativeModel(settings.VERTEXAI_MODEL_NAME)
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from django.db import connections, transaction
+from django.http import Http404
+
+from .db import ARCHIVE_DATABASE
+from .models import ArchivedComment, Comment
+from .sharding import comment_shards, comments_for_post
+
+
+def archive_comments(older_than: datetime, batch_size: int = 500) -> int:
+    """
+    Moves comments created before ``older_than`` into the archive database in batches.
+    Rows are copied before they are deleted and the copy ignores existing ids, so an
+    interrupted run can simply be repeated. The live rows are removed with a plain
+    DELETE, so live replies keep the parent_id of an archived parent instead of the
+    ORM setting it to NULL. Post counters keep including archived comments because
+    they stay readable through the API.
+    Returns the number of archived comments.
+    """
+    archived = 0
+    for shard in comment_shards():
+        comments = Comment.objects.using(shard).filter(created_at__lt=older_than).order_by("id")
+        while True:
+            batch = list(comments.prefetch_related("author")[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic(using=ARCHIVE_DATABASE):
+                ArchivedComment.objects.bulk_create(
+                    [ArchivedComment.from_comment(comment) for comment in batch], ignore_conflicts=True
+                )
+            ids = [comment.id for comment in batch]
+            with transaction.atomic(using=shard), connections[shard].cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {Comment._meta.db_table} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids
+                )
+            archived += len(batch)
+    return archived
+
+
+def get_archived_comments(post_id: int):
+    return ArchivedComment.objects.filter(post_id=post_id).order_by("id")
+
+
+def get_archived_thread(post_id: int, root_path: str):
+    return ArchivedComment.objects.filter(
+        post_id=post_id,
+        path__gte=root_path,
+        path__lt=root_path + Comment.PATH_UPPER_BOUND,
+    )
+
+
+def find_comment(post_id: int, comment_id: int):
+    """
+    Looks a comment up in the live table first and falls back to the archive.
+    """
+    comment = comments_for_post(post_id).filter(id=comment_id).first()
+    if comment is None:
+        comment = ArchivedComment.objects.filter(id=comment_id, post_id=post_id).first()
+    if comment is None:
+        raise Http404("No Comment matches the given query.")
+    return comment
@@ -0,0 +1,91 @@
+from django.db.models import Count, F, Max, Q
+from django.db.models.functions import Greatest
+
+from .models import ArchivedComment, Comment, Post
+from .sharding import comment_shards, comments_for_post
+
+
+def increment_comment_counters(comment: Comment):
+    """
+    Accounts for a freshly created comment on its post's denormalized counters.
+    """
+    Post.objects.filter(id=comment.post_id).update(
+        comment_count=F("comment_count") + 1,
+        blocked_count=F("blocked_count") + int(comment.blocked),
+        last_comment_at=comment.created_at,
+    )
+
+
+def decrement_comment_counters(comment: Comment):
+    """
+    Removes a deleted comment from its post's counters and recomputes the
+    latest comment timestamp from the remaining live comments, or the archived
+    ones when none is left. Counters never go below zero; any drift is left for
+    reconcile_post_counters.
+    """
+    latest = comments_for_post(comment.post_id).order_by("-created_at").values_list("created_at", flat=True).first()
+    if latest is None:
+        latest = ArchivedComment.objects.filter(post_id=comment.post_id).aggregate(latest=Max("created_at"))["latest"]
+    Post.objects.filter(id=comment.post_id).update(
+        comment_count=Greatest(F("comment_count") - 1, 0),
+        blocked_count=Greatest(F("blocked_count") - int(comment.blocked), 0),
+        last_comment_at=latest,
+    )
+
+
+def set_comment_blocked(comment: Comment, blocked: bool):
+    """
+    Moderates a single comment and keeps the post's blocked counter in step.
+    """
+    if comment.blocked == blocked:
+        return
+    comment.blocked = blocked
+    comment.save(update_fields=["blocked"])
+    Post.objects.filter(id=comment.post_id).update(
+        blocked_count=Greatest(F("blocked_count") + (1 if blocked else -1), 0),
+    )
+
+
+def _comment_stats(comments, post_ids):
+    stats = (
+        comments.filter(post_id__in=post_ids)
+        .values("post_id")
+        .annotate(total=Count("id"), blocked=Count("id", filter=Q(blocked=True)), last=Max("created_at"))
+        .order_by()
+    )
+    return {row["post_id"]: row for row in stats}
+
+
+def reconcile_post_counters(posts=None, batch_size: int = 1000) -> int:
+    """
+    Recomputes counters from the live and archived comments and repairs the posts
+    that drifted. Returns the number of repaired posts.
+    """
+    posts = (posts if posts is not None else Post.objects.all()).order_by("id")
+
+    repaired = 0
+    last_id = 0
+    while True:
+        batch = list(posts.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        post_ids = [post.id for post in batch]
+        sources = [_comment_stats(Comment.objects.using(shard), post_ids) for shard in comment_shards()]
+        sources.append(_comment_stats(ArchivedComment.objects, post_ids))
+
+        drifted = []
+        for post in batch:
+            stats = [source[post.id] for source in sources if post.id in source]
+            actual = (
+                sum(row["total"] for row in stats),
+                sum(row["blocked"] for row in stats),
+                max((row["last"] for row in stats), default=None),
+            )
+            if (post.comment_count, post.blocked_count, post.last_comment_at) == actual:
+                continue
+            post.comment_count, post.blocked_count, post.last_comment_at = actual
+            drifted.append(post)
+        if drifted:
+            repaired += Post.objects.bulk_update(drifted, ["comment_count", "blocked_count", "last_comment_at"])
+    return repaired
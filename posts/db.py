@@ -0,0 +1,154 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+from django.dispatch import receiver
+
+from .models import Comment, Post
+from .sharding import comment_shard
+
+ARCHIVE_DATABASE = "archive"
+READ_DATABASE = "read"
+READ_ONLY_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+_read_only_request = ContextVar("read_only_request", default=False)
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Tunes every new SQLite connection with the PRAGMAs of the active database profile.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if connection.alias in settings.COMMENT_SHARD_ALIASES:
+            # Posts and users live in the default database, so shards cannot enforce
+            # the comment foreign keys.
+            cursor.execute("PRAGMA foreign_keys = OFF")
+
+
+@receiver(post_migrate)
+def reserve_comment_shard_ids(sender, using, **kwargs):
+    """
+    Starts each shard's comment id sequence in its own range, so comment ids stay
+    unique across shards, the default database and the archive.
+    """
+    if sender.name != "posts" or using not in settings.COMMENT_SHARD_ALIASES:
+        return
+    start = (settings.COMMENT_SHARD_ALIASES.index(using) + 1) * settings.COMMENT_SHARD_ID_SPAN
+    table = Comment._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s "
+            "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)",
+            [table, start, table],
+        )
+        cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s", [start, table, start])
+
+
+class ReadOnlyRequestMiddleware:
+    """
+    Marks safe-method requests so ReadReplicaRouter can send their queries to the read connection.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _read_only_request.set(request.method in READ_ONLY_METHODS)
+        try:
+            return self.get_response(request)
+        finally:
+            _read_only_request.reset(token)
+
+
+class ArchiveRouter:
+    """
+    Keeps ArchivedComment in the archive database and every other model out of it.
+    """
+
+    archived_models = {"archivedcomment"}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.model_name in self.archived_models:
+            return ARCHIVE_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == ARCHIVE_DATABASE:
+            return app_label == "posts" and model_name in self.archived_models
+        if model_name in self.archived_models:
+            return False
+        return None
+
+
+class ReadReplicaRouter:
+    """
+    Sends the reads of read-only requests to the "read" connection when it is configured.
+    With WAL enabled it reads the same SQLite file without waiting on writers.
+    """
+
+    def db_for_read(self, model, **hints):
+        if settings.COMMENT_SHARD_ALIASES and model._meta.model_name in CommentShardRouter.sharded_models:
+            return None
+        if _read_only_request.get() and READ_DATABASE in settings.DATABASES:
+            return READ_DATABASE
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {"default", READ_DATABASE}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == READ_DATABASE:
+            return False
+        return None
+
+
+class CommentShardRouter:
+    """
+    Routes Comment rows to the shard of their post when COMMENT_SHARDS is set, and
+    sends relations of sharded comments (post, author) back to the default database.
+    Queries without an instance hint must pick the shard explicitly, see posts.sharding.
+    """
+
+    sharded_models = {"comment"}
+
+    def _shard(self, model, hints):
+        instance = hints.get("instance")
+        if model._meta.model_name not in self.sharded_models:
+            if isinstance(instance, Comment):
+                return DEFAULT_DB_ALIAS
+            return None
+        if isinstance(instance, Comment):
+            return instance._state.db or comment_shard(instance.post_id)
+        if isinstance(instance, Post):
+            return comment_shard(instance.pk)
+        return None
+
+    def db_for_read(self, model, **hints):
+        if not settings.COMMENT_SHARD_ALIASES:
+            return None
+        return self._shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.db_for_read(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if settings.COMMENT_SHARD_ALIASES and {obj1._meta.model_name, obj2._meta.model_name} & self.sharded_models:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.COMMENT_SHARD_ALIASES:
+            return app_label == "posts" and model_name in self.sharded_models
+        return None
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .models import Comment
+from .schemas import CommentResponseSchema
+from .sharding import comments_for_post
+
+Event = Tuple[int, str]
+
+
+def format_event(comment: Comment) -> Event:
+    data = CommentResponseSchema.from_model(comment).model_dump_json()
+    return comment.id, f"id: {comment.id}\nevent: comment\ndata: {data}\n\n"
+
+
+class _Channel:
+    def __init__(self, last_id: int):
+        self.last_id = last_id
+        # Events with ids above floor are all in recent, so resumes from there skip the database.
+        self.floor = last_id
+        self.recent = deque(maxlen=settings.COMMENT_STREAM_BUFFER_SIZE)
+        self.subscribers = set()
+        self.poller = None
+
+
+class CommentEventDispatcher:
+    """
+    Fans out new comments of a post to every stream subscribed to it in this process.
+    Comments published by this process are pushed at once; a single poller per post
+    picks up comments written by other processes, so subscribers never query the
+    database themselves except to resume from an event older than the buffer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def publish(self, comment: Comment):
+        """
+        Pushes a committed comment to its post's subscribers. Safe to call from any thread.
+        """
+        with self._lock:
+            channel = self._channels.get(comment.post_id)
+            if channel is None or comment.id <= channel.last_id:
+                return
+            event = format_event(comment)
+            channel.last_id = comment.id
+            if len(channel.recent) == channel.recent.maxlen:
+                channel.floor = channel.recent[0][0]
+            channel.recent.append(event)
+            subscribers = list(channel.subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def _latest_comment_id(self, post_id: int) -> int:
+        return comments_for_post(post_id).order_by("-id").values_list("id", flat=True).first() or 0
+
+    def _comments_after(self, post_id: int, after_id: int) -> List[Comment]:
+        comments = comments_for_post(post_id).filter(id__gt=after_id).order_by("id").prefetch_related("author")
+        return list(comments[: settings.COMMENT_STREAM_BUFFER_SIZE])
+
+    async def _poll(self, post_id: int, channel: _Channel):
+        while True:
+            await asyncio.sleep(settings.COMMENT_STREAM_POLL_SECONDS)
+            for comment in await sync_to_async(self._comments_after)(post_id, channel.last_id):
+                self.publish(comment)
+
+    async def _subscribe(self, post_id: int, subscriber) -> _Channel:
+        last_id = None
+        while True:
+            with self._lock:
+                channel = self._channels.get(post_id)
+                if channel is None and last_id is not None:
+                    channel = self._channels[post_id] = _Channel(last_id)
+                    channel.poller = asyncio.get_running_loop().create_task(self._poll(post_id, channel))
+                if channel is not None:
+                    channel.subscribers.add(subscriber)
+                    return channel
+            last_id = await sync_to_async(self._latest_comment_id)(post_id)
+
+    def _unsubscribe(self, post_id: int, subscriber):
+        with self._lock:
+            channel = self._channels.get(post_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(subscriber)
+            if not channel.subscribers:
+                channel.poller.cancel()
+                del self._channels[post_id]
+
+    async def _backlog(self, post_id: int, channel: _Channel, last_event_id: int) -> List[Event]:
+        with self._lock:
+            if last_event_id >= channel.floor:
+                return [event for event in channel.recent if event[0] > last_event_id]
+        comments = await sync_to_async(self._comments_after)(post_id, last_event_id)
+        return [format_event(comment) for comment in comments]
+
+    async def stream(self, post_id: int, last_event_id: Optional[int] = None):
+        """
+        Yields Server-Sent Events for new comments on a post, first replaying the ones
+        after ``last_event_id`` when a client resumes.
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        channel = await self._subscribe(post_id, subscriber)
+        try:
+            yield f"retry: {settings.COMMENT_STREAM_POLL_SECONDS * 1000}\n\n"
+            sent_id = last_event_id or 0
+            if last_event_id is not None:
+                for event_id, event in await self._backlog(post_id, channel, last_event_id):
+                    sent_id = event_id
+                    yield event
+            while True:
+                try:
+                    event_id, event = await asyncio.wait_for(
+                        subscriber[1].get(), timeout=settings.COMMENT_STREAM_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if event_id > sent_id:
+                    sent_id = event_id
+                    yield event
+        finally:
+            self._unsubscribe(post_id, subscriber)
+
+
+comment_events = CommentEventDispatcher()
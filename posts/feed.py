@@ -0,0 +1,91 @@
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Post
+
+TIMELINE_CACHE_KEY = "posts:feed:timeline"
+
+
+def _store_timeline(entries: List[Tuple[int, int]], complete: bool):
+    cache.set(TIMELINE_CACHE_KEY, (entries, complete), timeout=settings.FEED_TIMELINE_CACHE_SECONDS)
+
+
+def rebuild_timeline() -> Tuple[List[Tuple[int, int]], bool]:
+    """
+    Caches the (post_id, author_id) pairs of the most recent posts, newest first, and
+    whether they are all the posts there are. Ordering by primary key walks the index
+    backwards, so no sort is needed.
+    """
+    entries = list(Post.objects.order_by("-id").values_list("id", "author_id")[: settings.FEED_TIMELINE_SIZE])
+    complete = len(entries) < settings.FEED_TIMELINE_SIZE
+    _store_timeline(entries, complete)
+    return entries, complete
+
+
+def get_timeline() -> Tuple[List[Tuple[int, int]], bool]:
+    timeline = cache.get(TIMELINE_CACHE_KEY)
+    if timeline is None:
+        timeline = rebuild_timeline()
+    return timeline
+
+
+def add_to_timeline(post_id: int, author_id: int):
+    """
+    Adds a new post to the cached timeline instead of rebuilding it. The cache entry
+    expires after FEED_TIMELINE_CACHE_SECONDS, which bounds how long an update lost
+    to a concurrent writer can go unnoticed.
+    """
+    timeline = cache.get(TIMELINE_CACHE_KEY)
+    if timeline is None:
+        return
+    entries, complete = timeline
+    entries = sorted({*entries, (post_id, author_id)}, reverse=True)
+    if len(entries) > settings.FEED_TIMELINE_SIZE:
+        entries, complete = entries[: settings.FEED_TIMELINE_SIZE], False
+    _store_timeline(entries, complete)
+
+
+def remove_from_timeline(post_id: int):
+    timeline = cache.get(TIMELINE_CACHE_KEY)
+    if timeline is None:
+        return
+    entries, complete = timeline
+    # An incomplete timeline stays incomplete: pages past its end fall back to the database.
+    _store_timeline([entry for entry in entries if entry[0] != post_id], complete)
+
+
+def get_feed_ids(limit: int, before: Optional[int] = None, author_id: Optional[int] = None):
+    """
+    Returns the ids of a page of posts across all authors, newest first, and the cursor for
+    the next page. Pages inside the cached window are served from the timeline; older pages
+    fall back to an indexed keyset query.
+    """
+    entries, timeline_complete = get_timeline()
+    window = [
+        post_id
+        for post_id, post_author_id in entries
+        if (before is None or post_id < before) and (author_id is None or post_author_id == author_id)
+    ]
+    if len(window) > limit or timeline_complete:
+        post_ids = window[: limit + 1]
+    else:
+        posts = Post.objects.order_by("-id")
+        if before is not None:
+            posts = posts.filter(id__lt=before)
+        if author_id is not None:
+            posts = posts.filter(author_id=author_id)
+        post_ids = list(posts.values_list("id", flat=True)[: limit + 1])
+
+    next_cursor = post_ids[limit - 1] if len(post_ids) > limit else None
+    return post_ids[:limit], next_cursor
+
+
+def get_feed(limit: int, before: Optional[int] = None, author_id: Optional[int] = None):
+    """
+    Returns a page of posts across all authors, newest first, and the cursor for the next page.
+    """
+    post_ids, next_cursor = get_feed_ids(limit, before=before, author_id=author_id)
+    posts_by_id = Post.objects.select_related("author").in_bulk(post_ids)
+    return [posts_by_id[post_id] for post_id in post_ids if post_id in posts_by_id], next_cursor
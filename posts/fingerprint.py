@@ -0,0 +1,69 @@
+import hashlib
+import re
+from typing import List, Optional
+
+SIMHASH_BITS = 64
+BAND_COUNT = 8
+SHINGLE_SIZE = 3
+BAND_BITS = SIMHASH_BITS // BAND_COUNT
+# Texts with fewer distinct shingles than this (empty, punctuation or emoji only, a
+# word or two) all hash alike, so they get no fingerprint and skip the spam rules.
+MIN_FEATURES = 8
+
+
+def _features(text: str) -> List[str]:
+    # Character shingles of the normalized text: short comments still get enough
+    # features, and a changed word only changes the shingles around it.
+    normalized = " ".join(re.findall(r"\w+", text.lower()))
+    return [normalized[start : start + SHINGLE_SIZE] for start in range(max(len(normalized) - SHINGLE_SIZE + 1, 1))]
+
+
+def _simhash(features: List[str]) -> int:
+    # A bit is set when more than half of the feature hashes have it set. The hashes
+    # are counted column-wise over their binary strings, which keeps the loop in C.
+    digests = [
+        format(int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big"), f"0{SIMHASH_BITS}b")
+        for feature in features
+    ]
+    half = len(digests) / 2
+    return sum(
+        1 << (SIMHASH_BITS - 1 - column)
+        for column, bits in enumerate(zip(*digests, strict=True))
+        if bits.count("1") > half
+    )
+
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash of a text. Texts differing in a word or two get fingerprints
+    differing in a few bits, unrelated texts in about half of them.
+    """
+    return _simhash(_features(text))
+
+
+def content_fingerprint(text: str) -> Optional[int]:
+    """
+    SimHash of a comment, or None when the text has too few features to tell
+    near-duplicates from unrelated texts.
+    """
+    features = _features(text)
+    if len(set(features)) < MIN_FEATURES:
+        return None
+    return _simhash(features)
+
+
+def bands(fingerprint: int) -> List[int]:
+    """
+    Splits a fingerprint into LSH bands. Fingerprints within BAND_COUNT - 1 bits of
+    each other share at least one band, so equal bands find every near-duplicate.
+    """
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (band * BAND_BITS) & mask for band in range(BAND_COUNT)]
+
+
+def from_bands(values: List[int]) -> int:
+    return sum(value << (band * BAND_BITS) for band, value in enumerate(values))
+
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
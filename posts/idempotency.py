@@ -0,0 +1,113 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from typing import Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from ninja.errors import HttpError
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# Transient answers the client should be able to retry with the same key.
+UNSTORED_STATUS_CODES = {429}
+
+
+def _request_hash(request) -> str:
+    return hashlib.sha256(f"{request.method} {request.path}\n".encode() + request.body).hexdigest()
+
+
+def _claim(user, key: str, request_hash: str) -> Tuple[IdempotencyKey, bool]:
+    """
+    Returns the key record and whether this request owns it. A request owns a new
+    key, an expired one, or one whose owner stopped responding for longer than the
+    lock timeout; the conditional update lets only one retry take such a key over.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(
+                user=user, key=key, request_hash=request_hash, locked_at=now, expires_at=expires_at
+            )
+        return record, True
+    except IntegrityError:
+        record = IdempotencyKey.objects.filter(user=user, key=key).first()
+        if record is None:
+            # The owner failed and released the key in the meantime.
+            return _claim(user, key, request_hash)
+
+    abandoned = record.status_code is None and record.locked_at <= now - timedelta(
+        seconds=settings.IDEMPOTENCY_LOCK_SECONDS
+    )
+    if record.expires_at <= now or abandoned:
+        taken = IdempotencyKey.objects.filter(id=record.id, locked_at=record.locked_at).update(
+            request_hash=request_hash, status_code=None, response=None, locked_at=now, expires_at=expires_at
+        )
+        record.refresh_from_db()
+        return record, bool(taken)
+    return record, False
+
+
+def _store(record: IdempotencyKey, status_code: int, response):
+    IdempotencyKey.objects.filter(id=record.id).update(status_code=status_code, response=response)
+
+
+def _json(result):
+    if hasattr(result, "model_dump"):
+        return result.model_dump(mode="json")
+    return json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+
+
+def idempotent(view):
+    """
+    Makes a write route honour the Idempotency-Key header: the first response for a
+    key (errors included) is stored and replayed on retries instead of running the
+    route again. Retries while the first request is running get 409, and reusing a
+    key for a different request gets 422. Apply below the router decorator.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > IdempotencyKey._meta.get_field("key").max_length:
+            raise HttpError(400, f"{IDEMPOTENCY_HEADER} is too long")
+
+        request_hash = _request_hash(request)
+        record, claimed = _claim(request.auth, key, request_hash)
+        if not claimed:
+            if record.request_hash != request_hash:
+                raise HttpError(422, f"{IDEMPOTENCY_HEADER} was already used for a different request")
+            if record.status_code is None:
+                raise HttpError(409, "A request with this Idempotency-Key is still in progress")
+            response = JsonResponse(record.response, status=record.status_code, safe=False)
+            response["Idempotent-Replayed"] = "true"
+            return response
+
+        try:
+            result = view(request, *args, **kwargs)
+        except HttpError as error:
+            if error.status_code in UNSTORED_STATUS_CODES:
+                record.delete()
+            else:
+                _store(record, error.status_code, {"detail": error.message})
+            raise
+        except BaseException:
+            # Nothing to replay; let the client retry with the same key.
+            record.delete()
+            raise
+        _store(record, 200, _json(result))
+        return result
+
+    return wrapper
+
+
+def purge_expired_keys() -> int:
+    return IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()[0]
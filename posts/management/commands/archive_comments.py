@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.archive import archive_comments
+
+
+class Command(BaseCommand):
+    help = "Moves comments older than the retention period into the archive database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.COMMENT_RETENTION_DAYS)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(days=options["days"])
+        archived = archive_comments(older_than, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} comment(s) created before {older_than:%Y-%m-%d}"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.utils import get_auto_reply_metrics
+
+
+class Command(BaseCommand):
+    help = "Shows auto-reply generation cache hits and misses and the estimated input/output tokens saved."
+
+    def handle(self, *args, **options):
+        for name, value in get_auto_reply_metrics().items():
+            self.stdout.write(f"{name}={value}")
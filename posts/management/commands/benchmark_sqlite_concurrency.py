@@ -0,0 +1,103 @@
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+SCHEMA = """
+CREATE TABLE post (id INTEGER PRIMARY KEY, comment_count INTEGER NOT NULL DEFAULT 0);
+CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER NOT NULL, content TEXT NOT NULL);
+CREATE INDEX comment_post_id ON comment (post_id);
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares write/read throughput and 'database is locked' errors of the default SQLite "
+        "configuration against the production profile (PRAGMAs and BEGIN IMMEDIATE) under concurrent access."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=4)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--posts", type=int, default=100)
+
+    def handle(self, *args, **options):
+        profiles = {
+            "default": ({}, "DEFERRED"),
+            "production": (settings.SQLITE_PRODUCTION_PRAGMAS, settings.SQLITE_PRODUCTION_TRANSACTION_MODE),
+        }
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, (pragmas, transaction_mode) in profiles.items():
+                result = self.run_profile(Path(tmp_dir) / f"{name}.sqlite3", pragmas, transaction_mode, options)
+                self.stdout.write(
+                    f"{name:<10} writes/s={result['writes'] / options['seconds']:>9.1f} "
+                    f"reads/s={result['reads'] / options['seconds']:>9.1f} "
+                    f"locked_errors={result['locked']}"
+                )
+
+    def connect(self, path, pragmas):
+        # Like Django's SQLite backend: 5s busy timeout and explicit BEGIN statements.
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        for pragma, value in pragmas.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+        return connection
+
+    def run_profile(self, path, pragmas, transaction_mode, options):
+        setup = self.connect(path, pragmas)
+        setup.executescript(SCHEMA)
+        setup.executemany("INSERT INTO post (id) VALUES (?)", [(i,) for i in range(options["posts"])])
+        setup.close()
+
+        counters = {"writes": 0, "reads": 0, "locked": 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options["seconds"]
+
+        def count(key):
+            with lock:
+                counters[key] += 1
+
+        def writer(worker_id):
+            connection = self.connect(path, pragmas)
+            i = 0
+            while time.monotonic() < deadline:
+                post_id = (worker_id + i) % options["posts"]
+                i += 1
+                try:
+                    # Mirrors add_comment: read the post, insert the comment, bump the counter.
+                    connection.execute(f"BEGIN {transaction_mode}")
+                    connection.execute("SELECT id FROM post WHERE id = ?", (post_id,)).fetchone()
+                    connection.execute("INSERT INTO comment (post_id, content) VALUES (?, ?)", (post_id, "x" * 200))
+                    connection.execute("UPDATE post SET comment_count = comment_count + 1 WHERE id = ?", (post_id,))
+                    connection.execute("COMMIT")
+                    count("writes")
+                except sqlite3.OperationalError:
+                    if connection.in_transaction:
+                        connection.execute("ROLLBACK")
+                    count("locked")
+            connection.close()
+
+        def reader(worker_id):
+            connection = self.connect(path, pragmas)
+            i = 0
+            while time.monotonic() < deadline:
+                post_id = (worker_id + i) % options["posts"]
+                i += 1
+                try:
+                    connection.execute("SELECT id, content FROM comment WHERE post_id = ?", (post_id,)).fetchall()
+                    count("reads")
+                except sqlite3.OperationalError:
+                    count("locked")
+            connection.close()
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(options["writers"])]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(options["readers"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return counters
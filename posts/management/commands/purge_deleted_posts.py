@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.purge import purge_post
+
+
+class Command(BaseCommand):
+    help = "Purges soft-deleted posts and their comments in bounded chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        post_ids = list(Post.all_objects.filter(is_deleted=True).values_list("id", flat=True))
+        for post_id in post_ids:
+            purged = purge_post(post_id, chunk_size=options["chunk_size"])
+            self.stdout.write(f"Purged post {post_id} with {purged} comment(s)")
+        self.stdout.write(self.style.SUCCESS(f"Purged {len(post_ids)} post(s)"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Deletes idempotency keys whose replay window has expired."
+
+    def handle(self, *args, **options):
+        purged = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} expired idempotency key(s)"))
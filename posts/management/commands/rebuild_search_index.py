@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Comment, Post
+from posts.search import get_search_backend
+from posts.sharding import comment_shards
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index from posts and comments."
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.clear()
+        posts = 0
+        for post in Post.objects.order_by("id").iterator(chunk_size=1000):
+            backend.index_post(post)
+            posts += 1
+        comments = 0
+        for shard in comment_shards():
+            for comment in Comment.objects.using(shard).order_by("id").iterator(chunk_size=1000):
+                backend.index_comment(comment)
+                comments += 1
+        self.stdout.write(self.style.SUCCESS(f"Indexed {posts} post(s) and {comments} comment(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_post_counters
+
+
+class Command(BaseCommand):
+    help = "Recomputes denormalized comment counters on posts and repairs any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        repaired = reconcile_post_counters(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Repaired counters on {repaired} post(s)"))
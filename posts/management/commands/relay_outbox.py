@@ -0,0 +1,32 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.outbox import get_outbox_sink, prune_outbox, relay_outbox
+
+
+class Command(BaseCommand):
+    help = "Delivers pending outbox events to a sink in ordered batches and prunes old delivered events."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sink", choices=sorted(settings.OUTBOX_SINKS), default="file")
+        parser.add_argument("--target", required=True, help="File path or URL, depending on the sink.")
+        parser.add_argument("--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument("--follow", action="store_true", help="Keep relaying new events until interrupted.")
+        parser.add_argument("--interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        sink = get_outbox_sink(options["sink"], options["target"])
+        while True:
+            delivered = relay_outbox(sink, batch_size=options["batch_size"])
+            pruned = prune_outbox(timezone.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS))
+            if delivered or not options["follow"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Delivered {delivered} event(s), pruned {pruned} delivered event(s)")
+                )
+            if not options["follow"]:
+                break
+            time.sleep(options["interval"])
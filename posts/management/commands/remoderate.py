@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.moderation import remoderate_comments
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-checks stored comments with the current moderation prompt and model, updating their blocked flag. "
+        "Progress is checkpointed, so an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--checkpoint", default="remoderate.checkpoint.json")
+        parser.add_argument("--chunk-size", type=int, default=200)
+        parser.add_argument("--batch-size", type=int, default=10, help="Comments checked per model request.")
+        parser.add_argument("--concurrency", type=int, default=4, help="Model requests in flight at once.")
+        parser.add_argument("--keep-blocked", action="store_true", help="Never unblock comments.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        run = {"processed": 0}
+
+        def report(checkpoint, chunk_length):
+            run["processed"] += chunk_length
+            rate = run["processed"] / max(time.monotonic() - started, 1e-9)
+            self.stdout.write(
+                f"processed={checkpoint['processed']} changed={checkpoint['changed']} "
+                f"last_ids={checkpoint['last_ids']} comments/s={rate:.1f}"
+            )
+
+        checkpoint = remoderate_comments(
+            checkpoint_path=options["checkpoint"],
+            chunk_size=options["chunk_size"],
+            batch_size=options["batch_size"],
+            concurrency=options["concurrency"],
+            keep_blocked=options["keep_blocked"],
+            on_chunk=report,
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Re-moderated {checkpoint['processed']} comment(s), changed {checkpoint['changed']}, "
+                f"{run['processed'] / max(elapsed, 1e-9):.1f} comments/s"
+            )
+        )
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:28
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    posts = Post.objects.using(schema_editor.connection.alias).annotate(
+        actual_comments=Count("comments"),
+        actual_blocked=Count("comments", filter=Q(comments__blocked=True)),
+        actual_last=Max("comments__created_at"),
+    )
+    for post in posts.iterator(chunk_size=1000):
+        post.comment_count = post.actual_comments
+        post.blocked_count = post.actual_blocked
+        post.last_comment_at = post.actual_last
+        post.save(
+            using=schema_editor.connection.alias, update_fields=["comment_count", "blocked_count", "last_comment_at"]
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0002_comment_is_auto_reply"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="blocked_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="last_comment_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop, hints={"model_name": "post"}),
+    ]
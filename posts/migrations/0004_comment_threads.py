@@ -0,0 +1,55 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_paths(apps, schema_editor):
+    Comment = apps.get_model("posts", "Comment")
+    comments = Comment.objects.using(schema_editor.connection.alias)
+    batch = []
+    for comment in comments.only("id").iterator(chunk_size=1000):
+        comment.path = f"{comment.id:010d}/"
+        batch.append(comment)
+        if len(batch) >= 1000:
+            comments.bulk_update(batch, ["path"])
+            batch = []
+    if batch:
+        comments.bulk_update(batch, ["path"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0003_post_comment_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="depth",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="replies",
+                to="posts.comment",
+            ),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.CharField(blank=True, default="", max_length=231),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["post", "path"], name="posts_comment_thread_idx"),
+        ),
+        migrations.RunPython(backfill_paths, migrations.RunPython.noop, hints={"model_name": "comment"}),
+    ]
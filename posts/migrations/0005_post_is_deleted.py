@@ -0,0 +1,17 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0004_comment_threads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="is_deleted",
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0005_post_is_deleted"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedComment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("post_id", models.BigIntegerField()),
+                ("author_id", models.BigIntegerField()),
+                ("author_username", models.CharField(max_length=150)),
+                ("parent_id", models.BigIntegerField(blank=True, null=True)),
+                ("path", models.CharField(blank=True, default="", max_length=231)),
+                ("depth", models.PositiveSmallIntegerField(default=0)),
+                ("content", models.TextField()),
+                ("created_at", models.DateTimeField()),
+                ("blocked", models.BooleanField(default=False)),
+                ("is_auto_reply", models.BooleanField(default=False)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["post_id", "path"], name="posts_archived_thread_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.2 on 2026-10-19 02:05
+
+from django.db import migrations
+
+TABLE = "posts_search_index"
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    schema_editor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5(post_id UNINDEXED, title, body)")
+    alias = schema_editor.connection.alias
+    with schema_editor.connection.cursor() as cursor:
+        posts = Post.objects.using(alias).filter(is_deleted=False).values_list("id", "title", "content")
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, post_id, title, body) VALUES (%s, %s, %s, %s)",
+            [(post_id * 2, post_id, title, content) for post_id, title, content in posts.iterator()],
+        )
+        comments = Comment.objects.using(alias).filter(blocked=False).values_list("id", "post_id", "content")
+        cursor.executemany(
+            f"INSERT INTO {TABLE} (rowid, post_id, title, body) VALUES (%s, %s, %s, %s)",
+            [(comment_id * 2 + 1, post_id, "", content) for comment_id, post_id, content in comments.iterator()],
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0006_archivedcomment"),
+    ]
+
+    operations = [
+        # The index lives next to the posts; the hint keeps it out of the archive and comment shards.
+        migrations.RunPython(create_search_index, drop_search_index, hints={"model_name": "post"}),
+    ]
@@ -0,0 +1,128 @@
+# Generated by Django 5.1.2 on 2026-10-19 01:54
+
+import hashlib
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Copy of posts.fingerprint.content_fingerprint and bands(), so later changes
+# to the module cannot change what this backfill writes.
+BAND_COUNT = 8
+BAND_BITS = 8
+SHINGLE_SIZE = 3
+MIN_FEATURES = 8
+FINGERPRINT_FIELDS = [f"fingerprint_band_{band}" for band in range(BAND_COUNT)]
+
+
+def fingerprint_bands(text):
+    normalized = " ".join(re.findall(r"\w+", text.lower()))
+    features = [normalized[start : start + SHINGLE_SIZE] for start in range(max(len(normalized) - SHINGLE_SIZE + 1, 1))]
+    if len(set(features)) < MIN_FEATURES:
+        return [None] * BAND_COUNT
+    weights = [0] * (BAND_COUNT * BAND_BITS)
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+        for bit in range(len(weights)):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    fingerprint = sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (band * BAND_BITS) & mask for band in range(BAND_COUNT)]
+
+
+def backfill_fingerprints(apps, schema_editor):
+    Comment = apps.get_model("posts", "Comment")
+    comments = Comment.objects.using(schema_editor.connection.alias)
+    batch = []
+    for comment in comments.only("id", "content").iterator(chunk_size=1000):
+        for field, value in zip(FINGERPRINT_FIELDS, fingerprint_bands(comment.content), strict=True):
+            setattr(comment, field, value)
+        batch.append(comment)
+        if len(batch) >= 1000:
+            comments.bulk_update(batch, FINGERPRINT_FIELDS)
+            batch = []
+    if batch:
+        comments.bulk_update(batch, FINGERPRINT_FIELDS)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0008_outboxevent"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="fingerprint_band_0",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="fingerprint_band_1",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="fingerprint_band_2",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="fingerprint_band_3",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="fingerprint_band_4",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="fingerprint_band_5",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="fingerprint_band_6",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="fingerprint_band_7",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["fingerprint_band_0", "created_at"], name="posts_comment_band0_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["fingerprint_band_1", "created_at"], name="posts_comment_band1_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["fingerprint_band_2", "created_at"], name="posts_comment_band2_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["fingerprint_band_3", "created_at"], name="posts_comment_band3_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["fingerprint_band_4", "created_at"], name="posts_comment_band4_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["fingerprint_band_5", "created_at"], name="posts_comment_band5_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["fingerprint_band_6", "created_at"], name="posts_comment_band6_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(fields=["fingerprint_band_7", "created_at"], name="posts_comment_band7_idx"),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop, hints={"model_name": "comment"}),
+    ]
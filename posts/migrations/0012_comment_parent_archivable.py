@@ -0,0 +1,25 @@
+# Generated by Django 5.1.2 on 2026-10-19 02:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0011_admin_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="comment",
+            name="parent",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="replies",
+                to="posts.comment",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.2 on 2026-10-19 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0012_comment_parent_archivable"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AutoReplyMetric",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("value", models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.2 on 2026-10-19 02:30
+
+from django.db import migrations
+
+TABLE = "posts_search_index"
+
+
+def rebuild_search_index(apps, schema_editor, blocked_column):
+    # FTS5 tables cannot be altered, so the index is recreated and refilled.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    alias = schema_editor.connection.alias
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("posts", "Comment")
+    columns = (
+        "post_id UNINDEXED, blocked UNINDEXED, title, body" if blocked_column else "post_id UNINDEXED, title, body"
+    )
+    schema_editor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    schema_editor.execute(f"CREATE VIRTUAL TABLE {TABLE} USING fts5({columns})")
+    with schema_editor.connection.cursor() as cursor:
+        posts = Post.objects.using(alias).filter(is_deleted=False).values_list("id", "title", "content")
+        comments = Comment.objects.using(alias).values_list("id", "post_id", "content", "blocked")
+        if blocked_column:
+            sql = f"INSERT INTO {TABLE} (rowid, post_id, blocked, title, body) VALUES (%s, %s, %s, %s, %s)"
+            rows = [(post_id * 2, post_id, 0, title, content) for post_id, title, content in posts.iterator()]
+            rows += [
+                (comment_id * 2 + 1, post_id, int(blocked), "", content)
+                for comment_id, post_id, content, blocked in comments.iterator()
+            ]
+        else:
+            sql = f"INSERT INTO {TABLE} (rowid, post_id, title, body) VALUES (%s, %s, %s, %s)"
+            rows = [(post_id * 2, post_id, title, content) for post_id, title, content in posts.iterator()]
+            rows += [
+                (comment_id * 2 + 1, post_id, "", content)
+                for comment_id, post_id, content, blocked in comments.filter(blocked=False).iterator()
+            ]
+        cursor.executemany(sql, rows)
+
+
+def add_blocked_column(apps, schema_editor):
+    rebuild_search_index(apps, schema_editor, blocked_column=True)
+
+
+def remove_blocked_column(apps, schema_editor):
+    rebuild_search_index(apps, schema_editor, blocked_column=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("posts", "0013_autoreplymetric"),
+    ]
+
+    operations = [
+        # Blocked comments are indexed with a flag, so moderators can find them in the admin.
+        migrations.RunPython(add_blocked_column, remove_blocked_column, hints={"model_name": "post"}),
+    ]
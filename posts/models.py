@@ -1,6 +1,13 @@
 from django.contrib.auth.models import User
 from django.db import models
 
+from .fingerprint import BAND_COUNT, bands, content_fingerprint, from_bands
+
+
+class PostManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
 
 class Post(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -9,15 +16,198 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     auto_reply_enabled = models.BooleanField(default=False)
     reply_delay_minutes = models.IntegerField(default=5)
+    comment_count = models.PositiveIntegerField(default=0)
+    blocked_count = models.PositiveIntegerField(default=0)
+    last_comment_at = models.DateTimeField(null=True, blank=True)
+    is_deleted = models.BooleanField(default=False, db_index=True)
+
+    objects = PostManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["created_at"], name="posts_post_created_idx")]
 
 
 class Comment(models.Model):
+    # Materialized path: zero-padded ids of the ancestors and the comment itself,
+    # e.g. "0000000012/0000000034/". Sorting by path yields depth-first thread order
+    # and a subtree is the contiguous range [path, path + PATH_UPPER_BOUND).
+    PATH_SEGMENT_WIDTH = 10
+    PATH_UPPER_BOUND = "~"
+    MAX_DEPTH = 20
+
     post = models.ForeignKey(Post, related_name="comments", on_delete=models.CASCADE)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
+    # No database constraint: a live reply keeps pointing at its parent after the
+    # parent has been moved to the archive database.
+    parent = models.ForeignKey(
+        "self", related_name="replies", null=True, blank=True, on_delete=models.SET_NULL, db_constraint=False
+    )
+    path = models.CharField(max_length=(PATH_SEGMENT_WIDTH + 1) * (MAX_DEPTH + 1), blank=True, default="")
+    depth = models.PositiveSmallIntegerField(default=0)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     blocked = models.BooleanField(default=False)
     is_auto_reply = models.BooleanField(default=False)
+    # SimHash of the content split into LSH bands, see posts.fingerprint and posts.spam.
+    fingerprint_band_0 = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    fingerprint_band_1 = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    fingerprint_band_2 = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    fingerprint_band_3 = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    fingerprint_band_4 = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    fingerprint_band_5 = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    fingerprint_band_6 = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    fingerprint_band_7 = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+
+    FINGERPRINT_FIELDS = [f"fingerprint_band_{band}" for band in range(BAND_COUNT)]
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["post", "path"], name="posts_comment_thread_idx"),
+            models.Index(fields=["created_at"], name="posts_comment_created_idx"),
+            models.Index(fields=["blocked", "created_at"], name="posts_comment_blocked_idx"),
+        ] + [
+            models.Index(fields=[f"fingerprint_band_{band}", "created_at"], name=f"posts_comment_band{band}_idx")
+            for band in range(BAND_COUNT)
+        ]
+
+    # Content the fingerprint bands were computed from; None when they were not.
+    _fingerprinted_content = None
+
+    def __str__(self):
+        return self.content[:50]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "content" not in instance.get_deferred_fields():
+            instance._fingerprinted_content = instance.content
+        return instance
+
+    @property
+    def fingerprint(self):
+        values = [getattr(self, field) for field in self.FINGERPRINT_FIELDS]
+        return None if None in values else from_bands(values)
+
+    @fingerprint.setter
+    def fingerprint(self, fingerprint):
+        values = bands(fingerprint) if fingerprint is not None else [None] * BAND_COUNT
+        for field, value in zip(self.FINGERPRINT_FIELDS, values, strict=True):
+            setattr(self, field, value)
+        self._fingerprinted_content = self.content
+
+    def save(self, *args, **kwargs):
+        if not self.pk and self.parent_id:
+            self.depth = self.parent.depth + 1
+        # SimHash is costly on long texts: only recompute it when new content is saved
+        # and the caller has not passed the fingerprint it already computed.
+        update_fields = kwargs.get("update_fields")
+        saves_content = update_fields is None or "content" in update_fields
+        if (
+            saves_content
+            and "content" not in self.get_deferred_fields()
+            and self._fingerprinted_content != self.content
+        ):
+            self.fingerprint = content_fingerprint(self.content)
+        super().save(*args, **kwargs)
+        if not self.path:
+            parent_path = self.parent.path if self.parent_id else ""
+            self.path = f"{parent_path}{self.pk:0{self.PATH_SEGMENT_WIDTH}d}/"
+            Comment.objects.using(self._state.db).filter(pk=self.pk).update(path=self.path)
+
+
+class ArchivedComment(models.Model):
+    """
+    A comment moved out of the live table by the retention policy. Lives in the
+    "archive" database, so relations are kept as plain ids.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    post_id = models.BigIntegerField()
+    author_id = models.BigIntegerField()
+    author_username = models.CharField(max_length=150)
+    parent_id = models.BigIntegerField(null=True, blank=True)
+    path = models.CharField(max_length=Comment._meta.get_field("path").max_length, blank=True, default="")
+    depth = models.PositiveSmallIntegerField(default=0)
+    content = models.TextField()
+    created_at = models.DateTimeField()
+    blocked = models.BooleanField(default=False)
+    is_auto_reply = models.BooleanField(default=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["post_id", "path"], name="posts_archived_thread_idx")]
 
     def __str__(self):
         return self.content[:50]
+
+    @classmethod
+    def from_comment(cls, comment: Comment):
+        return cls(
+            id=comment.id,
+            post_id=comment.post_id,
+            author_id=comment.author_id,
+            author_username=comment.author.username,
+            parent_id=comment.parent_id,
+            path=comment.path,
+            depth=comment.depth,
+            content=comment.content,
+            created_at=comment.created_at,
+            blocked=comment.blocked,
+            is_auto_reply=comment.is_auto_reply,
+        )
+
+
+class OutboxEvent(models.Model):
+    """
+    A change to posts or comments, recorded in the transaction that made it and
+    delivered to downstream consumers by the relay_outbox command.
+    """
+
+    topic = models.CharField(max_length=50)
+    post_id = models.BigIntegerField()
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["id"], condition=models.Q(delivered_at__isnull=True), name="posts_outbox_pending_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    The first response to a write request sent with an Idempotency-Key header,
+    replayed when the client retries. A key without status_code is still in flight.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+    locked_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "key"], name="posts_idempotency_key_unique")]
+
+    def __str__(self):
+        return self.key
+
+
+class AutoReplyMetric(models.Model):
+    """
+    A running total of auto-reply generation, shared by every worker process and
+    read by the auto_reply_stats command. Values may go negative, see posts.utils.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
@@ -0,0 +1,82 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .counters import reconcile_post_counters
+from .models import Comment, Post
+from .search import get_search_backend
+from .sharding import comment_shards
+from .validators import check_for_profanity_batch
+
+
+def load_checkpoint(path) -> dict:
+    if path and Path(path).exists():
+        return json.loads(Path(path).read_text())
+    return {"last_ids": {}, "processed": 0, "changed": 0, "post_ids": []}
+
+
+def save_checkpoint(path, checkpoint: dict):
+    if not path:
+        return
+    # Write and rename, so an interruption never leaves a truncated checkpoint behind.
+    tmp_path = Path(f"{path}.tmp")
+    tmp_path.write_text(json.dumps(checkpoint))
+    tmp_path.replace(path)
+
+
+def _moderate(batch):
+    return check_for_profanity_batch([comment.content for comment in batch])
+
+
+def remoderate_comments(
+    checkpoint_path=None,
+    chunk_size: int = 200,
+    batch_size: int = 10,
+    concurrency: int = 4,
+    keep_blocked=False,
+    on_chunk=None,
+) -> dict:
+    """
+    Re-checks live comments with the current moderation model, walking each shard by
+    primary key. Every chunk is split into batches that are moderated concurrently,
+    changed verdicts are written with one bulk_update, and the position is saved to
+    the checkpoint file so an interrupted run resumes after the last finished chunk.
+    Counters of the affected posts are reconciled once the walk is complete.
+    Returns the final checkpoint.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    backend = get_search_backend()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for shard in comment_shards():
+            comments = Comment.objects.using(shard).only("id", "post_id", "content", "blocked").order_by("id")
+            while True:
+                chunk = list(comments.filter(id__gt=checkpoint["last_ids"].get(shard, 0))[:chunk_size])
+                if not chunk:
+                    break
+                batches = [chunk[start : start + batch_size] for start in range(0, len(chunk), batch_size)]
+                verdicts = [
+                    blocked for batch_verdicts in executor.map(_moderate, batches) for blocked in batch_verdicts
+                ]
+
+                changed = []
+                for comment, blocked in zip(chunk, verdicts, strict=True):
+                    if comment.blocked != blocked and (blocked or not keep_blocked):
+                        comment.blocked = blocked
+                        changed.append(comment)
+                Comment.objects.using(shard).bulk_update(changed, ["blocked"])
+                for comment in changed:
+                    backend.index_comment(comment)
+
+                checkpoint["last_ids"][shard] = chunk[-1].id
+                checkpoint["processed"] += len(chunk)
+                checkpoint["changed"] += len(changed)
+                checkpoint["post_ids"] = sorted(set(checkpoint["post_ids"]) | {comment.post_id for comment in changed})
+                save_checkpoint(checkpoint_path, checkpoint)
+                if on_chunk:
+                    on_chunk(checkpoint, len(chunk))
+
+    if checkpoint["post_ids"]:
+        reconcile_post_counters(Post.all_objects.filter(id__in=checkpoint["post_ids"]))
+    if checkpoint_path:
+        Path(checkpoint_path).unlink(missing_ok=True)
+    return checkpoint
@@ -0,0 +1,122 @@
+import json
+import urllib.request
+from typing import List
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Comment, OutboxEvent, Post
+from .schemas import CommentResponseSchema, PostResponseSchema
+
+POST_CREATED = "post.created"
+POST_DELETED = "post.deleted"
+COMMENT_CREATED = "comment.created"
+COMMENT_DELETED = "comment.deleted"
+
+
+def record_event(topic: str, post_id: int, payload: dict) -> OutboxEvent:
+    """
+    Adds an event to the outbox. Call it inside the transaction that makes the change,
+    so the event is stored if and only if the change is.
+    """
+    return OutboxEvent.objects.create(topic=topic, post_id=post_id, payload=payload)
+
+
+def record_post_created(post: Post):
+    return record_event(POST_CREATED, post.id, PostResponseSchema.from_model(post).model_dump(mode="json"))
+
+
+def record_post_deleted(post_id: int):
+    return record_event(POST_DELETED, post_id, {"post_id": post_id})
+
+
+def record_comment_created(comment: Comment):
+    return record_event(
+        COMMENT_CREATED, comment.post_id, CommentResponseSchema.from_model(comment).model_dump(mode="json")
+    )
+
+
+def record_comment_deleted(comment: Comment):
+    return record_event(COMMENT_DELETED, comment.post_id, {"comment_id": comment.id, "post_id": comment.post_id})
+
+
+def event_message(event: OutboxEvent) -> dict:
+    return {
+        "id": event.id,
+        "topic": event.topic,
+        "post_id": event.post_id,
+        "payload": event.payload,
+        "created_at": event.created_at,
+    }
+
+
+class OutboxSink:
+    """
+    Destination of relayed events. ``send`` receives one ordered batch of messages
+    and must raise if the batch was not accepted, so it is retried on the next run.
+    """
+
+    def __init__(self, target: str):
+        self.target = target
+
+    def send(self, messages: List[dict]):
+        raise NotImplementedError
+
+
+class FileSink(OutboxSink):
+    """
+    Appends messages to a file as JSON lines.
+    """
+
+    def send(self, messages):
+        with open(self.target, "a", encoding="utf-8") as file:
+            for message in messages:
+                file.write(json.dumps(message, cls=DjangoJSONEncoder) + "\n")
+
+
+class HttpSink(OutboxSink):
+    """
+    POSTs each batch as a JSON array to a URL, e.g. a local stand-in for a message broker.
+    """
+
+    timeout = 10
+
+    def send(self, messages):
+        request = urllib.request.Request(
+            self.target,
+            data=json.dumps(messages, cls=DjangoJSONEncoder).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+def get_outbox_sink(name: str, target: str) -> OutboxSink:
+    return import_string(settings.OUTBOX_SINKS[name])(target)
+
+
+def relay_outbox(sink: OutboxSink, batch_size: int = None) -> int:
+    """
+    Delivers pending events to the sink in id order, one batch at a time, and marks
+    each batch delivered once the sink accepted it. Delivery is at least once: a
+    batch interrupted between the two steps is sent again, so consumers should
+    deduplicate by event id. Returns the number of delivered events.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    pending = OutboxEvent.objects.filter(delivered_at__isnull=True).order_by("id")
+    delivered = 0
+    while True:
+        batch = list(pending[:batch_size])
+        if not batch:
+            break
+        sink.send([event_message(event) for event in batch])
+        OutboxEvent.objects.filter(id__in=[event.id for event in batch]).update(delivered_at=timezone.now())
+        delivered += len(batch)
+    return delivered
+
+
+def prune_outbox(older_than) -> int:
+    return OutboxEvent.objects.filter(delivered_at__lt=older_than).delete()[0]
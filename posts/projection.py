@@ -0,0 +1,84 @@
+from typing import Dict, List, Optional
+
+from django.contrib.auth.models import User
+from ninja.errors import HttpError
+
+from .models import Post
+
+# Response field -> columns it is read from. A live author is only an id; usernames
+# are fetched in one query afterwards because comment shards hold no users.
+POST_FIELDS = {
+    "post_id": ["id"],
+    "author": ["author_id"],
+    "title": ["title"],
+    "content": ["content"],
+    "auto_reply_enabled": ["auto_reply_enabled"],
+    "reply_delay_minutes": ["reply_delay_minutes"],
+    "comment_count": ["comment_count"],
+    "blocked_count": ["blocked_count"],
+    "last_comment_at": ["last_comment_at"],
+}
+COMMENT_FIELDS = {
+    "comment_id": ["id"],
+    "post_id": ["post_id"],
+    "author": ["author_id"],
+    "content": ["content"],
+    "created_at": ["created_at"],
+    "blocked": ["blocked"],
+    "is_auto_reply": ["is_auto_reply"],
+    "parent_id": ["parent_id"],
+    "depth": ["depth"],
+}
+ARCHIVED_COMMENT_FIELDS = {**COMMENT_FIELDS, "author": ["author_id", "author_username"]}
+
+
+def parse_fields(fields: Optional[str], known: Dict[str, List[str]]) -> Optional[List[str]]:
+    """
+    Parses a comma-separated ``fields`` parameter. Returns None when every field is wanted.
+    """
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in known]
+    if unknown:
+        raise HttpError(400, f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+def project(queryset, known: Dict[str, List[str]], names: List[str]) -> List[dict]:
+    """
+    Reads only the columns behind ``names`` with values() and shapes the rows like
+    the response schema, without instantiating models.
+    """
+    columns = list(dict.fromkeys(column for name in names for column in known[name]))
+    rows = list(queryset.values(*columns))
+
+    usernames = {}
+    if "author" in names and "author_username" not in columns:
+        author_ids = {row["author_id"] for row in rows}
+        usernames = dict(User.objects.filter(id__in=author_ids).values_list("id", "username"))
+
+    items = []
+    for row in rows:
+        item = {}
+        for name in names:
+            if name == "author":
+                username = row["author_username"] if "author_username" in row else usernames.get(row["author_id"])
+                item[name] = {"id": row["author_id"], "username": username}
+            elif name == "created_at":
+                # Comment responses carry created_at as an ISO string.
+                item[name] = row["created_at"].isoformat()
+            else:
+                item[name] = row[known[name][0]]
+        items.append(item)
+    return items
+
+
+def project_posts(post_ids: List[int], names: List[str]) -> List[dict]:
+    """
+    Projects the posts with the given ids in that order; unknown ids are skipped.
+    """
+    # The id is always read to restore the order.
+    posts = project(Post.objects.filter(id__in=post_ids), POST_FIELDS, list(dict.fromkeys(["post_id", *names])))
+    by_id = {post["post_id"]: post for post in posts}
+    return [{name: by_id[post_id][name] for name in names} for post_id in post_ids if post_id in by_id]
@@ -0,0 +1,46 @@
+from threading import Thread
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from .models import ArchivedComment, Post
+from .sharding import comment_transaction, comments_for_post
+
+
+def purge_post(post_id: int, chunk_size: int = None) -> int:
+    """
+    Deletes the comments of a soft-deleted post in bounded chunks, each in its own
+    short transaction that also updates the post's counters, then deletes the post.
+    Returns the number of deleted comments.
+    """
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    purged = 0
+    while True:
+        with comment_transaction(post_id):
+            # Newest first, so replies go before the comments they answer.
+            chunk = list(comments_for_post(post_id).order_by("-id").values_list("id", "blocked")[:chunk_size])
+            if not chunk:
+                break
+            blocked = sum(1 for _, is_blocked in chunk if is_blocked)
+            comments_for_post(post_id).filter(id__in=[comment_id for comment_id, _ in chunk]).delete()
+            Post.all_objects.filter(id=post_id).update(
+                comment_count=Greatest(F("comment_count") - len(chunk), 0),
+                blocked_count=Greatest(F("blocked_count") - blocked, 0),
+            )
+        purged += len(chunk)
+    purged += ArchivedComment.objects.filter(post_id=post_id).delete()[0]
+    Post.all_objects.filter(id=post_id, is_deleted=True).delete()
+    return purged
+
+
+def _purge_in_background(post_id: int):
+    try:
+        purge_post(post_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_purge(post_id: int):
+    Thread(target=_purge_in_background, args=(post_id,), daemon=True).start()
@@ -1,45 +1,77 @@
+import heapq
+from itertools import islice
+from operator import attrgetter
 from threading import Timer
-from typing import List
+from typing import List, Optional
 
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
 from django.db.models import Count, Q
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from ninja import Query, Router
 from ninja.errors import HttpError
 from ninja_jwt.authentication import JWTAuth as AuthBearer
 
+from .archive import find_comment, get_archived_comments, get_archived_thread
+from .counters import decrement_comment_counters, increment_comment_counters
+from .events import comment_events
+from .feed import add_to_timeline, get_feed, get_feed_ids, remove_from_timeline
+from .fingerprint import content_fingerprint
+from .idempotency import idempotent
 from .models import Comment, Post
+from .outbox import record_comment_created, record_comment_deleted, record_post_created, record_post_deleted
+from .projection import ARCHIVED_COMMENT_FIELDS, COMMENT_FIELDS, POST_FIELDS, parse_fields, project, project_posts
+from .purge import schedule_purge
 from .schemas import (
+    CommentFieldsSchema,
     CommentResponseSchema,
-    ContentSchema,
+    CommentSchema,
     DateRangeQuery,
+    FeedQuery,
+    FeedResponseSchema,
+    PostBatchQuery,
+    PostFieldsSchema,
+    PostListSchema,
     PostResponseSchema,
     PostSchema,
+    SearchQuery,
+    SearchResponseSchema,
+    ThreadQuery,
 )
+from .search import get_search_backend
+from .sharding import comment_shards, comment_transaction, comments_for_post
+from .spam import is_blocked_duplicate, is_duplicate_burst, remember_rejected
 from .utils import auto_reply
 from .validators import check_for_profanity, validate_and_parse_date
 
 router = Router(tags=["posts"])
 
 
-@router.get("", auth=AuthBearer(), response=List[PostSchema])
-def get_posts(request):
-    posts = Post.objects.filter(author=request.auth)
-    return posts
+@router.get("", auth=AuthBearer(), response=List[PostFieldsSchema], exclude_unset=True)
+def get_posts(request, fields: Optional[str] = None):
+    names = parse_fields(fields, POST_FIELDS) or list(PostListSchema.model_fields)
+    return project(Post.objects.filter(author=request.auth), POST_FIELDS, names)
 
 
 @router.post("", auth=AuthBearer(), response=PostResponseSchema)
+@idempotent
 def create_post(request, payload: PostSchema):
     if check_for_profanity(payload.content):
         raise HttpError(400, "Content contains inappropriate language")
 
-    post = Post.objects.create(
-        author=request.auth,
-        title=payload.title,
-        content=payload.content,
-        auto_reply_enabled=payload.auto_reply_enabled,
-        reply_delay_minutes=payload.reply_delay_minutes,
-    )
+    with transaction.atomic():
+        post = Post.objects.create(
+            author=request.auth,
+            title=payload.title,
+            content=payload.content,
+            auto_reply_enabled=payload.auto_reply_enabled,
+            reply_delay_minutes=payload.reply_delay_minutes,
+        )
+        record_post_created(post)
+
+    transaction.on_commit(lambda: add_to_timeline(post.id, post.author_id))
 
     if payload.auto_reply_enabled:
         Timer(payload.reply_delay_minutes * 60, auto_reply, args=(request, post.id)).start()
@@ -47,17 +79,54 @@ def create_post(request, payload: PostSchema):
     return PostResponseSchema.from_model(post)
 
 
-@router.get("{post_id}", auth=AuthBearer(), response=PostResponseSchema)
-def get_post(request, post_id: int):
-    post = get_object_or_404(Post, id=post_id)
-    return PostResponseSchema(
-        post_id=post.id,
-        author=request.auth,
-        title=post.title,
-        content=post.content,
-        auto_reply_enabled=post.auto_reply_enabled,
-        reply_delay_minutes=post.reply_delay_minutes,
+@router.get("feed", auth=AuthBearer(), response=FeedResponseSchema, exclude_unset=True)
+def get_posts_feed(request, filters: FeedQuery = Query(...)):
+    names = parse_fields(filters.fields, POST_FIELDS)
+    if names:
+        post_ids, next_cursor = get_feed_ids(filters.limit, before=filters.before, author_id=filters.author_id)
+        return {"items": project_posts(post_ids, names), "next_cursor": next_cursor}
+    posts, next_cursor = get_feed(filters.limit, before=filters.before, author_id=filters.author_id)
+    return FeedResponseSchema(
+        items=[PostResponseSchema.from_model(post) for post in posts],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("search", auth=AuthBearer(), response=SearchResponseSchema)
+def search_posts(request, filters: SearchQuery = Query(...)):
+    try:
+        hits, next_cursor = get_search_backend().search(filters.q, filters.limit, cursor=filters.cursor)
+    except ValueError:
+        raise HttpError(400, "Invalid cursor") from None
+    # Comments of posts awaiting purge stay indexed until the purge removes them.
+    hidden = set(
+        Post.all_objects.filter(id__in={hit["post_id"] for hit in hits}, is_deleted=True).values_list("id", flat=True)
     )
+    return SearchResponseSchema(items=[hit for hit in hits if hit["post_id"] not in hidden], next_cursor=next_cursor)
+
+
+@router.get("batch", auth=AuthBearer(), response=List[PostFieldsSchema], exclude_unset=True)
+def get_posts_batch(request, filters: PostBatchQuery = Query(...)):
+    names = parse_fields(filters.fields, POST_FIELDS) or list(POST_FIELDS)
+    try:
+        ids = list(dict.fromkeys(int(post_id) for post_id in filters.ids.split(",") if post_id.strip()))
+    except ValueError:
+        raise HttpError(400, "ids must be comma-separated integers") from None
+    if len(ids) > settings.POST_BATCH_MAX_IDS:
+        raise HttpError(400, f"At most {settings.POST_BATCH_MAX_IDS} ids per request")
+    return project_posts(ids, names)
+
+
+@router.get("{post_id}", auth=AuthBearer(), response=PostFieldsSchema, exclude_unset=True)
+def get_post(request, post_id: int, fields: Optional[str] = None):
+    names = parse_fields(fields, POST_FIELDS)
+    if names:
+        posts = project(Post.objects.filter(id=post_id), POST_FIELDS, names)
+        if not posts:
+            raise Http404("No Post matches the given query.")
+        return posts[0]
+    post = get_object_or_404(Post.objects.select_related("author"), id=post_id)
+    return PostResponseSchema.from_model(post)
 
 
 @router.put("{post_id}/", auth=AuthBearer(), response=PostResponseSchema)
@@ -67,7 +136,8 @@ def update_post(request, post_id: int, payload: PostSchema):
     post.content = payload.content
     post.auto_reply_enabled = payload.auto_reply_enabled
     post.reply_delay_minutes = payload.reply_delay_minutes
-    post.save()
+    # Only the edited columns: the counters are maintained with F() updates elsewhere.
+    post.save(update_fields=["title", "content", "auto_reply_enabled", "reply_delay_minutes"])
     return PostResponseSchema(
         post_id=post.id,
         author=request.auth,
@@ -75,38 +145,117 @@ def update_post(request, post_id: int, payload: PostSchema):
         content=post.content,
         auto_reply_enabled=post.auto_reply_enabled,
         reply_delay_minutes=post.reply_delay_minutes,
+        comment_count=post.comment_count,
+        blocked_count=post.blocked_count,
+        last_comment_at=post.last_comment_at,
     )
 
 
 @router.delete("{post_id}/", auth=AuthBearer())
 def delete_post(request, post_id: int):
     post = get_object_or_404(Post, id=post_id, author=request.auth)
-    post.delete()
+    with transaction.atomic():
+        Post.objects.filter(id=post.id).update(is_deleted=True)
+        record_post_deleted(post.id)
+    get_search_backend().remove_post(post.id)
+    transaction.on_commit(lambda: remove_from_timeline(post.id))
+    transaction.on_commit(lambda: schedule_purge(post.id))
     return {"status": "OK"}
 
 
 @router.post("{post_id}/comments", auth=AuthBearer(), response=CommentResponseSchema)
-def add_comment(request, post_id: int, payload: ContentSchema):
+@idempotent
+def add_comment(request, post_id: int, payload: CommentSchema):
     post = get_object_or_404(Post, id=post_id)
+    parent = get_object_or_404(comments_for_post(post.id), id=payload.parent_id) if payload.parent_id else None
+    if parent and parent.depth >= Comment.MAX_DEPTH:
+        raise HttpError(400, "Thread is too deep")
+    # Near-duplicates of spam are answered from their fingerprint, without a model call.
+    fingerprint = content_fingerprint(payload.content)
+    if is_duplicate_burst(request.auth.id, fingerprint):
+        raise HttpError(429, "Too many similar comments, try again later")
+    if is_blocked_duplicate(fingerprint):
+        raise HttpError(400, "Content contains inappropriate language")
     if check_for_profanity(payload.content):
+        remember_rejected(fingerprint)
         raise HttpError(400, "Content contains inappropriate language")
-    comment = Comment.objects.create(post=post, author=request.auth, content=payload.content)
+    with comment_transaction(post.id):
+        comment = post.comments.create(
+            author=request.auth, parent=parent, content=payload.content, fingerprint=fingerprint
+        )
+        increment_comment_counters(comment)
+        record_comment_created(comment)
+        transaction.on_commit(lambda: comment_events.publish(comment))
     return CommentResponseSchema.from_model(comment)
 
 
-@router.get("{post_id}/comments", auth=AuthBearer(), response=List[CommentResponseSchema])
-def get_comments(request, post_id: int):
+@router.get("{post_id}/comments", auth=AuthBearer(), response=List[CommentFieldsSchema], exclude_unset=True)
+def get_comments(request, post_id: int, fields: Optional[str] = None):
     post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.all().select_related("author")
+    names = parse_fields(fields, COMMENT_FIELDS)
+    if names:
+        return project(get_archived_comments(post.id), ARCHIVED_COMMENT_FIELDS, names) + project(
+            post.comments.all(), COMMENT_FIELDS, names
+        )
+    comments = post.comments.all().prefetch_related("author")
 
-    serialized_comments = [CommentResponseSchema.from_model(comment) for comment in comments]
+    serialized_comments = [CommentResponseSchema.from_archive(comment) for comment in get_archived_comments(post.id)]
+    serialized_comments += [CommentResponseSchema.from_model(comment) for comment in comments]
     return serialized_comments
 
 
+@router.get("{post_id}/comments/stream", auth=AuthBearer())
+def stream_comments(request, post_id: int, last_event_id: Optional[int] = None):
+    """
+    Server-Sent Events of new comments. Served as an async stream under ASGI; clients
+    resume with the Last-Event-ID header (or the last_event_id query parameter).
+    A WSGI worker would be held for the lifetime of every connection, so the stream
+    is refused there.
+    """
+    if not isinstance(request, ASGIRequest):
+        raise HttpError(501, "Comment streaming requires the ASGI server")
+    post = get_object_or_404(Post, id=post_id)
+    header = request.headers.get("Last-Event-ID")
+    if header and header.isdigit():
+        last_event_id = int(header)
+    response = StreamingHttpResponse(comment_events.stream(post.id, last_event_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@router.get("{post_id}/comments/{comment_id}/thread", auth=AuthBearer(), response=List[CommentResponseSchema])
+def get_comment_thread(request, post_id: int, comment_id: int, filters: ThreadQuery = Query(...)):
+    get_object_or_404(Post, id=post_id)
+    root = find_comment(post_id, comment_id)
+    cursor = find_comment(post_id, filters.after) if filters.after else None
+
+    def page(thread):
+        if filters.max_depth is not None:
+            thread = thread.filter(depth__lte=root.depth + filters.max_depth)
+        if cursor:
+            thread = thread.filter(path__gt=cursor.path)
+        return thread.order_by("path")[: filters.limit]
+
+    live = page(
+        comments_for_post(post_id)
+        .filter(path__gte=root.path, path__lt=root.path + Comment.PATH_UPPER_BOUND)
+        .prefetch_related("author")
+    )
+    # Archived parts of the thread come from the slower archive database.
+    archived = page(get_archived_thread(post_id, root.path))
+    thread = islice(heapq.merge(live, archived, key=attrgetter("path")), filters.limit)
+    return [CommentResponseSchema.from_any(comment) for comment in thread]
+
+
 @router.delete("{post_id}/comments/{comment_id}", auth=AuthBearer())
 def delete_comment(request, post_id: int, comment_id: int):
-    comment = get_object_or_404(Comment, id=comment_id, post_id=post_id, author=request.auth)
-    comment.delete()
+    get_object_or_404(Post, id=post_id)
+    comment = get_object_or_404(comments_for_post(post_id), id=comment_id, author=request.auth)
+    with comment_transaction(post_id):
+        record_comment_deleted(comment)
+        comment.delete()
+        decrement_comment_counters(comment)
     return {"status": "OK"}
 
 
@@ -114,16 +263,28 @@ def delete_comment(request, post_id: int, comment_id: int):
 def comments_daily_breakdown(request, filters: DateRangeQuery = Query(...)):
     date_from = validate_and_parse_date(filters.date_from)
     date_to = validate_and_parse_date(filters.date_to)
-    comments = Comment.objects.filter(created_at__date__range=(date_from, date_to))
-
-    daily_stats = (
-        comments.extra({"day": "date(created_at)"})
-        .values("day")
-        .annotate(
-            total_comments=Count("id"),
-            blocked_comments=Count("id", filter=Q(blocked=True)),
+    deleted_post_ids = list(Post.all_objects.filter(is_deleted=True).values_list("id", flat=True))
+
+    # Scatter the aggregation over every comment shard and gather the per-day totals.
+    daily_stats = {}
+    for shard in comment_shards():
+        comments = (
+            Comment.objects.using(shard)
+            .filter(created_at__date__range=(date_from, date_to))
+            .exclude(post_id__in=deleted_post_ids)
         )
-        .order_by("day")
-    )
+        shard_stats = (
+            comments.extra({"day": "date(created_at)"})
+            .values("day")
+            .annotate(
+                total_comments=Count("id"),
+                blocked_comments=Count("id", filter=Q(blocked=True)),
+            )
+            .order_by("day")
+        )
+        for row in shard_stats:
+            day = daily_stats.setdefault(row["day"], {"day": row["day"], "total_comments": 0, "blocked_comments": 0})
+            day["total_comments"] += row["total_comments"]
+            day["blocked_comments"] += row["blocked_comments"]
 
-    return JsonResponse({"daily_breakdown": list(daily_stats)}, status=200)
+    return JsonResponse({"daily_breakdown": [daily_stats[day] for day in sorted(daily_stats)]}, status=200)
@@ -1,8 +1,11 @@
+from datetime import datetime
+from typing import List, Optional
+
 from ninja import Field, Schema
 
 from users.schemas import UserSchema
 
-from .models import Comment, Post
+from .models import ArchivedComment, Comment, Post
 
 
 class ContentSchema(Schema):
@@ -16,8 +19,15 @@ class PostSchema(Schema):
     reply_delay_minutes: int = 0
 
 
+class PostListSchema(PostSchema):
+    comment_count: int = 0
+    blocked_count: int = 0
+    last_comment_at: Optional[datetime] = None
+
+
 class CommentSchema(Schema):
     content: str
+    parent_id: Optional[int] = None
 
 
 class AutoReplySchema(Schema):
@@ -29,6 +39,30 @@ class DateRangeQuery(Schema):
     date_to: str = Field(None, description="End date in YYYY-MM-DD format")
 
 
+class ThreadQuery(Schema):
+    max_depth: Optional[int] = Field(None, ge=0, description="Depth below the root comment to include")
+    after: Optional[int] = Field(None, description="Continue after this comment id in thread order")
+    limit: int = Field(100, ge=1, le=500)
+
+
+class FeedQuery(Schema):
+    before: Optional[int] = Field(None, description="Return posts older than this post id")
+    author_id: Optional[int] = None
+    limit: int = Field(20, ge=1, le=100)
+    fields: Optional[str] = Field(None, description="Comma-separated response fields to return")
+
+
+class SearchQuery(Schema):
+    q: str = Field(..., min_length=1, description="Words to search for in posts and comments")
+    cursor: Optional[str] = Field(None, description="next_cursor of the previous page")
+    limit: int = Field(20, ge=1, le=100)
+
+
+class PostBatchQuery(Schema):
+    ids: str = Field(..., description="Comma-separated post ids")
+    fields: Optional[str] = Field(None, description="Comma-separated response fields to return")
+
+
 class PostResponseSchema(Schema):
     post_id: int
     author: UserSchema
@@ -36,6 +70,9 @@ class PostResponseSchema(Schema):
     content: str
     auto_reply_enabled: bool = False
     reply_delay_minutes: int = 0
+    comment_count: int = 0
+    blocked_count: int = 0
+    last_comment_at: Optional[datetime] = None
 
     @classmethod
     def from_model(cls, post: Post):
@@ -46,9 +83,28 @@ class PostResponseSchema(Schema):
             content=post.content,
             auto_reply_enabled=post.auto_reply_enabled,
             reply_delay_minutes=post.reply_delay_minutes,
+            comment_count=post.comment_count,
+            blocked_count=post.blocked_count,
+            last_comment_at=post.last_comment_at,
         )
 
 
+class PostFieldsSchema(Schema):
+    """
+    PostResponseSchema with every field optional, for responses limited by ``fields``.
+    """
+
+    post_id: Optional[int] = None
+    author: Optional[UserSchema] = None
+    title: Optional[str] = None
+    content: Optional[str] = None
+    auto_reply_enabled: Optional[bool] = None
+    reply_delay_minutes: Optional[int] = None
+    comment_count: Optional[int] = None
+    blocked_count: Optional[int] = None
+    last_comment_at: Optional[datetime] = None
+
+
 class CommentResponseSchema(Schema):
     comment_id: int
     post_id: int
@@ -57,15 +113,73 @@ class CommentResponseSchema(Schema):
     created_at: str
     blocked: bool
     is_auto_reply: bool
+    parent_id: Optional[int] = None
+    depth: int = 0
 
     @classmethod
     def from_model(cls, comment: Comment):
         return cls(
             comment_id=comment.id,
-            post_id=comment.post.id,
+            post_id=comment.post_id,
             author=UserSchema(id=comment.author.id, username=comment.author.username),
             content=comment.content,
             created_at=comment.created_at.isoformat(),
             blocked=comment.blocked,
             is_auto_reply=comment.is_auto_reply,
+            parent_id=comment.parent_id,
+            depth=comment.depth,
         )
+
+    @classmethod
+    def from_archive(cls, comment: ArchivedComment):
+        return cls(
+            comment_id=comment.id,
+            post_id=comment.post_id,
+            author=UserSchema(id=comment.author_id, username=comment.author_username),
+            content=comment.content,
+            created_at=comment.created_at.isoformat(),
+            blocked=comment.blocked,
+            is_auto_reply=comment.is_auto_reply,
+            parent_id=comment.parent_id,
+            depth=comment.depth,
+        )
+
+    @classmethod
+    def from_any(cls, comment):
+        if isinstance(comment, ArchivedComment):
+            return cls.from_archive(comment)
+        return cls.from_model(comment)
+
+
+class CommentFieldsSchema(Schema):
+    """
+    CommentResponseSchema with every field optional, for responses limited by ``fields``.
+    """
+
+    comment_id: Optional[int] = None
+    post_id: Optional[int] = None
+    author: Optional[UserSchema] = None
+    content: Optional[str] = None
+    created_at: Optional[str] = None
+    blocked: Optional[bool] = None
+    is_auto_reply: Optional[bool] = None
+    parent_id: Optional[int] = None
+    depth: Optional[int] = None
+
+
+class FeedResponseSchema(Schema):
+    items: List[PostFieldsSchema]
+    next_cursor: Optional[int] = None
+
+
+class SearchHitSchema(Schema):
+    type: str
+    id: int
+    post_id: int
+    snippet: str
+    score: float
+
+
+class SearchResponseSchema(Schema):
+    items: List[SearchHitSchema]
+    next_cursor: Optional[str] = None
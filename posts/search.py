@@ -0,0 +1,185 @@
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Comment, Post
+
+
+class SearchBackend:
+    """
+    Interface of the full-text index over posts and comments. Hits are dicts with
+    "type", "id", "post_id", "snippet" and "score" keys, ordered by relevance.
+    Blocked comments are indexed too, but only found with include_blocked, and
+    hit_type ("post" or "comment") limits a search to one kind of hit.
+    search() raises ValueError for a cursor it did not return.
+    """
+
+    def index_post(self, post: Post):
+        raise NotImplementedError
+
+    def index_comment(self, comment: Comment):
+        raise NotImplementedError
+
+    def remove_post(self, post_id: int):
+        raise NotImplementedError
+
+    def remove_comment(self, comment_id: int):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        hit_type: Optional[str] = None,
+        include_blocked: bool = False,
+    ) -> Tuple[List[dict], Optional[str]]:
+        raise NotImplementedError
+
+
+class SqliteFTSBackend(SearchBackend):
+    """
+    SQLite FTS5 index. Posts and comments share one table; their rowids are derived
+    from the object ids (even for posts, odd for comments) so updates and deletes
+    are rowid lookups. Results are ranked with bm25, weighting titles higher, and
+    paginated with a (score, rowid) keyset cursor.
+    """
+
+    table = "posts_search_index"
+    title_weight = 5.0
+    body_weight = 1.0
+
+    def __init__(self, using: str = DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @classmethod
+    def create_table_sql(cls):
+        return (
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {cls.table} "
+            "USING fts5(post_id UNINDEXED, blocked UNINDEXED, title, body)"
+        )
+
+    @staticmethod
+    def post_rowid(post_id: int) -> int:
+        return post_id * 2
+
+    @staticmethod
+    def comment_rowid(comment_id: int) -> int:
+        return comment_id * 2 + 1
+
+    def _execute(self, sql, params=()):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall() if cursor.description else None
+
+    def _replace(self, rowid: int, post_id: int, title: str, body: str, blocked: bool = False):
+        self._execute(f"DELETE FROM {self.table} WHERE rowid = %s", [rowid])
+        self._execute(
+            f"INSERT INTO {self.table} (rowid, post_id, blocked, title, body) VALUES (%s, %s, %s, %s, %s)",
+            [rowid, post_id, int(blocked), title, body],
+        )
+
+    def index_post(self, post: Post):
+        if post.is_deleted:
+            self.remove_post(post.id)
+            return
+        self._replace(self.post_rowid(post.id), post.id, post.title, post.content)
+
+    def index_comment(self, comment: Comment):
+        # Blocked comments stay indexed for moderators; public searches filter them out.
+        self._replace(self.comment_rowid(comment.id), comment.post_id, "", comment.content, comment.blocked)
+
+    def remove_post(self, post_id: int):
+        self._execute(f"DELETE FROM {self.table} WHERE rowid = %s", [self.post_rowid(post_id)])
+
+    def remove_comment(self, comment_id: int):
+        self._execute(f"DELETE FROM {self.table} WHERE rowid = %s", [self.comment_rowid(comment_id)])
+
+    def clear(self):
+        self._execute(f"DELETE FROM {self.table}")
+
+    @staticmethod
+    def match_expression(query: str) -> str:
+        # Quote every term so user input is matched literally instead of as FTS5 syntax.
+        return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> Tuple[float, int]:
+        """
+        Splits a next_cursor into the score and rowid of the last hit; raises ValueError
+        when it was not produced by search().
+        """
+        last_score, separator, last_rowid = cursor.rpartition(":")
+        if not separator:
+            raise ValueError(f"Invalid search cursor: {cursor!r}")
+        return float(last_score), int(last_rowid)
+
+    def search(self, query, limit, cursor=None, hit_type=None, include_blocked=False):
+        expression = self.match_expression(query)
+        if not expression:
+            return [], None
+        score = f"bm25({self.table}, 0.0, 0.0, {self.title_weight}, {self.body_weight})"
+        sql = (
+            f"SELECT rowid, post_id, {score} AS score, "
+            f"snippet({self.table}, -1, '[', ']', '...', 12) FROM {self.table} WHERE {self.table} MATCH %s"
+        )
+        params = [expression]
+        if not include_blocked:
+            sql += " AND blocked = 0"
+        if hit_type is not None:
+            sql += " AND rowid %% 2 = %s"
+            params.append(1 if hit_type == "comment" else 0)
+        if cursor:
+            last_score, last_rowid = self.parse_cursor(cursor)
+            sql += f" AND ({score} > %s OR ({score} = %s AND rowid > %s))"
+            params += [last_score, last_score, last_rowid]
+        sql += " ORDER BY score, rowid LIMIT %s"
+        params.append(limit + 1)
+
+        rows = self._execute(sql, params)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][2]!r}:{rows[-1][0]}"
+        hits = [
+            {
+                "type": "comment" if rowid % 2 else "post",
+                "id": rowid // 2,
+                "post_id": post_id,
+                "snippet": snippet,
+                "score": -score,
+            }
+            for rowid, post_id, score, snippet in rows
+        ]
+        return hits, next_cursor
+
+
+def get_search_backend() -> SearchBackend:
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    get_search_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post(sender, instance, **kwargs):
+    get_search_backend().remove_post(instance.id)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    get_search_backend().index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment(sender, instance, **kwargs):
+    get_search_backend().remove_comment(instance.id)
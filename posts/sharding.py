@@ -0,0 +1,39 @@
+from contextlib import ExitStack, contextmanager
+from typing import List
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import Comment
+
+
+def comment_shard(post_id: int) -> str:
+    """
+    Shard map: the database alias holding the comments of a post.
+    """
+    aliases = settings.COMMENT_SHARD_ALIASES
+    if not aliases:
+        return DEFAULT_DB_ALIAS
+    return aliases[post_id % len(aliases)]
+
+
+def comment_shards() -> List[str]:
+    return list(dict.fromkeys(settings.COMMENT_SHARD_ALIASES)) or [DEFAULT_DB_ALIAS]
+
+
+def comments_for_post(post_id: int):
+    return Comment.objects.using(comment_shard(post_id)).filter(post_id=post_id)
+
+
+@contextmanager
+def comment_transaction(post_id: int):
+    """
+    Opens a transaction on the default database and, when comments are sharded, on the
+    post's shard too. Without sharding, comment writes and counter updates commit together.
+    """
+    with ExitStack() as stack:
+        stack.enter_context(transaction.atomic())
+        shard = comment_shard(post_id)
+        if shard != DEFAULT_DB_ALIAS:
+            stack.enter_context(transaction.atomic(using=shard))
+        yield
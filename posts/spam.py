@@ -0,0 +1,83 @@
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+from typing import List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .fingerprint import bands, from_bands, hamming_distance
+from .models import Comment
+from .sharding import comment_shards
+
+REJECTED_BUCKET_SIZE = 20
+
+
+def _near_duplicates(comments, fingerprint: int) -> List[int]:
+    """
+    Fingerprints of the comments sharing an LSH band with ``fingerprint`` that are
+    within SPAM_MAX_DISTANCE bits of it.
+    """
+    same_band = reduce(
+        or_, (Q(**{field: value}) for field, value in zip(Comment.FINGERPRINT_FIELDS, bands(fingerprint), strict=True))
+    )
+    candidates = (from_bands(row) for row in comments.filter(same_band).values_list(*Comment.FINGERPRINT_FIELDS))
+    return [
+        candidate for candidate in candidates if hamming_distance(candidate, fingerprint) <= settings.SPAM_MAX_DISTANCE
+    ]
+
+
+def _rejected_keys(fingerprint: int) -> List[str]:
+    return [f"spam:rejected:{band}:{value}" for band, value in enumerate(bands(fingerprint))]
+
+
+def remember_rejected(fingerprint: Optional[int]):
+    """
+    Keeps the fingerprint of a comment the model rejected, so near-duplicates of it
+    are rejected without another model call. Rejected comments are never stored, so
+    the cache is their only trace.
+    """
+    if fingerprint is None:
+        return
+    timeout = settings.SPAM_BLOCKED_WINDOW_HOURS * 3600
+    for key in _rejected_keys(fingerprint):
+        bucket = cache.get(key, [])[-(REJECTED_BUCKET_SIZE - 1) :]
+        cache.set(key, bucket + [fingerprint], timeout)
+
+
+def is_blocked_duplicate(fingerprint: Optional[int]) -> bool:
+    """
+    Whether the text is a near-duplicate of a recently rejected or blocked comment.
+    Texts without a fingerprint never are.
+    """
+    if fingerprint is None:
+        return False
+    for bucket in cache.get_many(_rejected_keys(fingerprint)).values():
+        if any(hamming_distance(rejected, fingerprint) <= settings.SPAM_MAX_DISTANCE for rejected in bucket):
+            return True
+    since = timezone.now() - timedelta(hours=settings.SPAM_BLOCKED_WINDOW_HOURS)
+    return any(
+        _near_duplicates(Comment.objects.using(shard).filter(blocked=True, created_at__gte=since), fingerprint)
+        for shard in comment_shards()
+    )
+
+
+def is_duplicate_burst(author_id: int, fingerprint: Optional[int]) -> bool:
+    """
+    Whether the author already posted SPAM_BURST_LIMIT near-duplicates of the text
+    within the burst window. Texts without a fingerprint never are.
+    """
+    if fingerprint is None:
+        return False
+    since = timezone.now() - timedelta(seconds=settings.SPAM_BURST_WINDOW_SECONDS)
+    recent = sum(
+        len(
+            _near_duplicates(
+                Comment.objects.using(shard).filter(author_id=author_id, created_at__gte=since), fingerprint
+            )
+        )
+        for shard in comment_shards()
+    )
+    return recent >= settings.SPAM_BURST_LIMIT
@@ -1,17 +1,68 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
 from datetime import timedelta
-from unittest.mock import ANY, patch
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from pathlib import Path
+from threading import Thread
+from unittest.mock import ANY, Mock, patch
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from django.db.models import F
+from django.shortcuts import get_object_or_404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
 from ninja.testing.client import TestClient
 from ninja_jwt.tokens import RefreshToken
 
-from .models import Comment, Post
+from .admin import CommentAdmin, EstimatedCountPaginator
+from .counters import reconcile_post_counters
+from .db import READ_DATABASE, CommentShardRouter, ReadOnlyRequestMiddleware, ReadReplicaRouter
+from .events import CommentEventDispatcher
+from .fingerprint import hamming_distance, simhash
+from .models import ArchivedComment, AutoReplyMetric, Comment, IdempotencyKey, OutboxEvent, Post
+from .outbox import (
+    COMMENT_CREATED,
+    COMMENT_DELETED,
+    POST_DELETED,
+    HttpSink,
+    record_post_created,
+    record_post_deleted,
+    relay_outbox,
+)
+from .purge import purge_post
 from .routes import router
+from .search import get_search_backend
+from .sharding import comment_shard, comment_shards
+from .utils import generate_auto_reply, get_auto_reply_metrics
+from .validators import check_for_profanity_batch
+from .warmup import warmup
 
 
 class CommonPostAPITestCase(TestCase):
+    # The production profile adds the "read" connection that serves GET requests.
+    databases = {"default", "archive"} | ({READ_DATABASE} & set(settings.DATABASES))
+
+    @classmethod
+    def setUpClass(cls):
+        # The "read" test mirror would be a second connection to the same in-memory
+        # database, locked out by the test transaction: serve it from "default".
+        if READ_DATABASE in cls.databases:
+            cls.addClassCleanup(connections.__setitem__, READ_DATABASE, connections[READ_DATABASE])
+            connections[READ_DATABASE] = connections["default"]
+        super().setUpClass()
+
     @classmethod
     def setUpTestData(cls):
         username = "testuser"
@@ -141,6 +192,36 @@ class PostAPITestCase(CommonPostAPITestCase):
         self.post.refresh_from_db()
         self.assertEqual(self.post.title, "Updated Post")
 
+    def update_post_after(self, concurrent_update):
+        """Updates the post while ``concurrent_update`` runs between the route's read and its save."""
+
+        def get_then_update(*args, **kwargs):
+            post = get_object_or_404(*args, **kwargs)
+            concurrent_update()
+            return post
+
+        with patch("posts.routes.get_object_or_404", side_effect=get_then_update):
+            response = self.client.put(
+                f"{self.post_url}{self.post.id}/",
+                {"title": "Updated Post", "content": "Updated Content"},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {self.access_token}"},
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_post_keeps_concurrent_counter_updates(self):
+        """Tests that updating a post does not write back stale comment counters."""
+        self.update_post_after(
+            lambda: Post.objects.filter(id=self.post.id).update(comment_count=F("comment_count") + 1)
+        )
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.comment_count), ("Updated Post", 1))
+
+    def test_update_post_does_not_undelete(self):
+        """Tests that a delete committed while the post is being updated is not reverted."""
+        self.update_post_after(lambda: Post.objects.filter(id=self.post.id).update(is_deleted=True))
+        self.assertTrue(Post.all_objects.get(id=self.post.id).is_deleted)
+
     def test_delete_post(self):
         """Test deleting a post."""
         response = self.client.delete(
@@ -151,6 +232,26 @@ class PostAPITestCase(CommonPostAPITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertFalse(Post.objects.filter(id=self.post.id).exists())
 
+    def test_delete_post_purges_comments_in_chunks(self):
+        """Tests that a deleted post is hidden at once and purged chunk by chunk later."""
+        for i in range(5):
+            Comment.objects.create(post=self.post, author=self.user, content=f"Comment {i}", blocked=i == 0)
+        Post.objects.filter(id=self.post.id).update(comment_count=5, blocked_count=1)
+
+        with patch("posts.routes.schedule_purge") as mock_schedule_purge:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(
+                    f"{self.post_url}{self.post.id}/",
+                    headers={"Authorization": f"Bearer {self.access_token}"},
+                )
+        self.assertEqual(response.status_code, 200)
+        mock_schedule_purge.assert_called_once_with(self.post.id)
+        self.assertTrue(Post.all_objects.filter(id=self.post.id, is_deleted=True).exists())
+
+        self.assertEqual(purge_post(self.post.id, chunk_size=2), 5)
+        self.assertFalse(Comment.objects.filter(post_id=self.post.id).exists())
+        self.assertFalse(Post.all_objects.filter(id=self.post.id).exists())
+
 
 class CommentAPITestCase(CommonPostAPITestCase):
     @classmethod
@@ -225,6 +326,15 @@ class CommentAPITestCase(CommonPostAPITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertFalse(Comment.objects.filter(id=comment.id).exists())
 
+    def test_stream_comments_requires_asgi(self):
+        """Tests that the comment stream is refused outside of the ASGI server."""
+        response = self.client.get(
+            f"{self.comment_url}/stream",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        self.assertEqual(response.status_code, 501)
+        self.assertIn("ASGI", response.json()["detail"])
+
 
 class CommentProfanityTestCase(CommonPostAPITestCase):
     @classmethod
@@ -297,3 +407,954 @@ class CommentsAnalyticsTestCase(CommonPostAPITestCase):
             self.assertIn("day", day_data)
             self.assertIn("total_comments", day_data)
             self.assertIn("blocked_comments", day_data)
+
+
+class PostCountersTestCase(CommonPostAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.comment_url = f"/api/posts/{cls.post.id}/comments"
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_counters_follow_add_and_delete_comment(self, _mock_check_for_profanity):
+        """Tests that comment counters are maintained by add_comment and delete_comment."""
+        response = self.client.post(
+            self.comment_url,
+            {"content": "First"},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertIsNotNone(self.post.last_comment_at)
+
+        response = self.client.delete(
+            f"{self.comment_url}/{response.json()['comment_id']}",
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertIsNone(self.post.last_comment_at)
+
+    def test_get_posts_returns_counters(self):
+        """Tests that get_posts exposes the denormalized counters."""
+        Post.objects.filter(id=self.post.id).update(comment_count=3, blocked_count=1)
+
+        response = self.client.get(
+            self.post_url,
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["comment_count"], 3)
+        self.assertEqual(response.json()[0]["blocked_count"], 1)
+
+    def test_reconcile_post_counters(self):
+        """Tests that the reconcile command repairs drifted counters."""
+        Comment.objects.create(post=self.post, author=self.user, content="Visible")
+        Comment.objects.create(post=self.post, author=self.user, content="Blocked", blocked=True)
+
+        call_command("reconcile_post_counters", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        self.assertEqual(self.post.blocked_count, 1)
+        self.assertIsNotNone(self.post.last_comment_at)
+
+
+class CommentThreadTestCase(CommonPostAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.comment_url = f"/api/posts/{cls.post.id}/comments"
+        cls.root = Comment.objects.create(post=cls.post, author=cls.user, content="Root")
+        cls.reply = Comment.objects.create(post=cls.post, author=cls.user, parent=cls.root, content="Reply")
+        cls.nested = Comment.objects.create(post=cls.post, author=cls.user, parent=cls.reply, content="Nested")
+        cls.other = Comment.objects.create(post=cls.post, author=cls.user, content="Other root")
+
+    def test_materialized_path(self):
+        """Tests that replies extend their parent's path and depth."""
+        self.assertEqual(self.root.path, f"{self.root.id:010d}/")
+        self.assertEqual(self.nested.path, f"{self.root.id:010d}/{self.reply.id:010d}/{self.nested.id:010d}/")
+        self.assertEqual(self.nested.depth, 2)
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_add_reply(self, _mock_check_for_profanity):
+        """Tests adding a reply to an existing comment."""
+        response = self.client.post(
+            self.comment_url,
+            {"content": "Another reply", "parent_id": self.root.id},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["parent_id"], self.root.id)
+        self.assertEqual(response.json()["depth"], 1)
+
+    def test_get_comment_thread(self):
+        """Tests retrieving a subtree in thread order, optionally limited by depth."""
+        response = self.client.get(
+            f"{self.comment_url}/{self.root.id}/thread",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["content"] for c in response.json()], ["Root", "Reply", "Nested"])
+
+        response = self.client.get(
+            f"{self.comment_url}/{self.root.id}/thread?max_depth=1",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        self.assertEqual([c["content"] for c in response.json()], ["Root", "Reply"])
+
+
+class PostFeedTestCase(CommonPostAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_user = User.objects.create_user(username="otheruser", password="#StrongPass1")
+        cls.other_post = Post.objects.create(author=cls.other_user, title="Other Post", content="Other Content")
+        cls.latest_post = Post.objects.create(author=cls.user, title="Latest Post", content="Latest Content")
+
+    def setUp(self):
+        cache.clear()
+
+    def get_feed(self, query=""):
+        return self.client.get(
+            f"{self.post_url}feed{query}",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+
+    def test_feed_across_authors(self):
+        """Tests that the feed lists posts from all authors, newest first, with keyset continuation."""
+        response = self.get_feed("?limit=2")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([post["title"] for post in data["items"]], ["Latest Post", "Other Post"])
+        self.assertEqual(data["next_cursor"], self.other_post.id)
+
+        data = self.get_feed(f"?limit=2&before={data['next_cursor']}").json()
+        self.assertEqual([post["title"] for post in data["items"]], ["Test Post"])
+        self.assertIsNone(data["next_cursor"])
+
+    def test_feed_author_filter(self):
+        """Tests filtering the feed by author."""
+        data = self.get_feed(f"?author_id={self.other_user.id}").json()
+        self.assertEqual([post["title"] for post in data["items"]], ["Other Post"])
+
+    @override_settings(FEED_TIMELINE_SIZE=1)
+    def test_feed_falls_back_past_cached_window(self):
+        """Tests that pages older than the cached timeline are served by the database."""
+        data = self.get_feed("?limit=2").json()
+        self.assertEqual([post["title"] for post in data["items"]], ["Latest Post", "Other Post"])
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_create_post_updates_cached_timeline(self, _mock_check_for_profanity):
+        """Tests that a new post is added to the cached timeline without rebuilding it."""
+        self.get_feed()
+        with patch("posts.feed.rebuild_timeline") as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    self.post_url,
+                    {"title": "Newest Post", "content": "Newest Content"},
+                    content_type="application/json",
+                    headers={"Authorization": f"Bearer {self.access_token}"},
+                )
+            data = self.get_feed("?limit=1").json()
+        rebuild.assert_not_called()
+        self.assertEqual([post["title"] for post in data["items"]], ["Newest Post"])
+
+    def test_delete_post_refreshes_feed(self):
+        """Tests that deleting a post removes it from the cached timeline."""
+        self.get_feed()
+        with patch("posts.routes.schedule_purge"), self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(
+                f"{self.post_url}{self.latest_post.id}/",
+                headers={"Authorization": f"Bearer {self.access_token}"},
+            )
+        data = self.get_feed().json()
+        self.assertNotIn("Latest Post", [post["title"] for post in data["items"]])
+
+
+class CommentArchiveTestCase(CommonPostAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.comment_url = f"/api/posts/{cls.post.id}/comments"
+        cls.old_comment = Comment.objects.create(post=cls.post, author=cls.user, content="Old Comment")
+        Comment.objects.filter(id=cls.old_comment.id).update(created_at=timezone.now() - timedelta(days=400))
+        cls.reply = Comment.objects.create(post=cls.post, author=cls.user, parent=cls.old_comment, content="Reply")
+
+    def test_archive_comments(self):
+        """Tests that old comments move to the archive and stay readable through the API."""
+        call_command("archive_comments", days=365, stdout=StringIO())
+
+        self.assertFalse(Comment.objects.filter(id=self.old_comment.id).exists())
+        self.assertTrue(ArchivedComment.objects.filter(id=self.old_comment.id).exists())
+
+        response = self.client.get(
+            self.comment_url,
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["content"] for c in response.json()], ["Old Comment", "Reply"])
+
+        response = self.client.get(
+            f"{self.comment_url}/{self.old_comment.id}/thread",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c["content"] for c in response.json()], ["Old Comment", "Reply"])
+
+    def test_archive_keeps_live_reply_parent(self):
+        """Tests that a live reply keeps pointing at its archived parent."""
+        call_command("archive_comments", days=365, stdout=StringIO())
+
+        self.reply.refresh_from_db()
+        self.assertEqual(self.reply.parent_id, self.old_comment.id)
+        self.assertEqual(self.reply.depth, 1)
+        self.assertEqual(self.reply.path, f"{self.old_comment.id:010d}/{self.reply.id:010d}/")
+
+    def test_deleting_last_live_comment_keeps_archived_timestamp(self):
+        """Tests that last_comment_at falls back to the archive once no live comment is left."""
+        call_command("archive_comments", days=365, stdout=StringIO())
+        reconcile_post_counters()
+        self.client.delete(
+            f"{self.comment_url}/{self.reply.id}",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+
+        self.post.refresh_from_db()
+        archived = ArchivedComment.objects.get(id=self.old_comment.id)
+        self.assertEqual((self.post.comment_count, self.post.last_comment_at), (1, archived.created_at))
+        self.assertEqual(reconcile_post_counters(Post.objects.filter(id=self.post.id)), 0)
+
+    def test_reconcile_counts_archived_comments(self):
+        """Tests that archived comments still count towards the post counters."""
+        call_command("archive_comments", days=365, stdout=StringIO())
+        call_command("reconcile_post_counters", stdout=StringIO())
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+
+
+class ReadReplicaRouterTestCase(SimpleTestCase):
+    def route(self, method):
+        routed = []
+
+        def view(request):
+            routed.append(ReadReplicaRouter().db_for_read(Post))
+
+        ReadOnlyRequestMiddleware(view)(RequestFactory().generic(method, "/api/posts/"))
+        return routed[0]
+
+    def test_routes_read_only_requests_to_read_connection(self):
+        """Tests that only safe-method requests read from the read connection."""
+        with patch.dict(settings.DATABASES, {"read": settings.DATABASES["default"]}):
+            self.assertEqual(self.route("GET"), "read")
+            self.assertIsNone(self.route("POST"))
+
+    def test_without_read_connection(self):
+        """Tests that reads stay on the default connection when no read connection is configured."""
+        databases = {alias: config for alias, config in settings.DATABASES.items() if alias != "read"}
+        with patch.dict(settings.DATABASES, databases, clear=True):
+            self.assertIsNone(self.route("GET"))
+
+    @override_settings(SQLITE_PRAGMAS=settings.SQLITE_PRODUCTION_PRAGMAS)
+    def test_production_pragmas_are_applied(self):
+        """Tests that new connections get the PRAGMAs of the production profile."""
+        # A file database (in-memory ones cannot use WAL) on an alias of its own, which
+        # SimpleTestCase lets connect.
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = SQLiteDatabaseWrapper(
+                {**connections.settings["default"], "NAME": str(Path(directory) / "db.sqlite3")}, alias="pragmas"
+            )
+            try:
+                with wrapper.cursor() as cursor:
+                    pragmas = {
+                        name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                        for name in ["journal_mode", "busy_timeout", "synchronous", "temp_store"]
+                    }
+            finally:
+                wrapper.close()
+        # synchronous=NORMAL reads back as 1 and temp_store=MEMORY as 2.
+        self.assertEqual(pragmas, {"journal_mode": "wal", "busy_timeout": 5000, "synchronous": 1, "temp_store": 2})
+
+
+@override_settings(COMMENT_SHARD_ALIASES=["comments_0", "comments_1", "comments_2"])
+class CommentShardingTestCase(SimpleTestCase):
+    def test_shard_map(self):
+        """Tests that comments are mapped to shards by post id."""
+        self.assertEqual(comment_shard(3), "comments_0")
+        self.assertEqual(comment_shard(4), "comments_1")
+        self.assertEqual(comment_shards(), ["comments_0", "comments_1", "comments_2"])
+
+    def test_router(self):
+        """Tests that comments follow their post's shard while their relations stay in the default database."""
+        router = CommentShardRouter()
+        post = Post(id=5)
+        comment = Comment(post=post)
+
+        self.assertEqual(router.db_for_write(Comment, instance=comment), "comments_2")
+        self.assertEqual(router.db_for_read(Comment, instance=post), "comments_2")
+        self.assertEqual(router.db_for_read(Post, instance=comment), "default")
+        self.assertFalse(router.allow_migrate("comments_0", "posts", model_name="post"))
+        self.assertTrue(router.allow_migrate("comments_0", "posts", model_name="comment"))
+
+    @override_settings(COMMENT_SHARD_ALIASES=[])
+    def test_sharding_disabled(self):
+        """Tests that comments stay in the default database without shards."""
+        self.assertEqual(comment_shard(5), "default")
+        self.assertIsNone(CommentShardRouter().db_for_read(Comment, instance=Post(id=5)))
+
+
+class SearchTestCase(CommonPostAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.search_url = f"{cls.post_url}search"
+        cls.gardening = Post.objects.create(author=cls.user, title="Gardening tips", content="Water tomatoes daily")
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.user, content="I love tomatoes too")
+
+    def search(self, query):
+        return self.client.get(
+            f"{self.search_url}{query}",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+
+    def test_search_ranks_posts_and_comments(self):
+        """Tests that search finds posts and comments through the index, with keyset pagination."""
+        response = self.search("?q=tomatoes&limit=1")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data["items"]), 1)
+        self.assertIsNotNone(data["next_cursor"])
+
+        second_page = self.search(f"?q=tomatoes&limit=1&cursor={data['next_cursor']}").json()
+        found = {(hit["type"], hit["id"]) for hit in data["items"] + second_page["items"]}
+        self.assertEqual(found, {("post", self.gardening.id), ("comment", self.comment.id)})
+        self.assertIsNone(second_page["next_cursor"])
+
+    def test_search_index_follows_updates_and_deletes(self):
+        """Tests that the index is kept in sync on update and delete."""
+        self.gardening.title = "Cooking tips"
+        self.gardening.content = "Roast peppers"
+        self.gardening.save()
+        self.comment.delete()
+
+        self.assertEqual(self.search("?q=tomatoes").json()["items"], [])
+        self.assertEqual(self.search("?q=peppers").json()["items"][0]["id"], self.gardening.id)
+
+    def test_search_query_syntax_is_escaped(self):
+        """Tests that FTS operators in the query are matched literally."""
+        response = self.search('?q=tomatoes" OR "x')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["items"], [])
+
+    def test_search_rejects_malformed_cursor(self):
+        """Tests that a cursor not returned by a previous page is a 400, not a 500."""
+        for cursor in ["garbage", "x:1", "1.0:y"]:
+            self.assertEqual(self.search(f"?q=tomatoes&cursor={cursor}").status_code, 400)
+
+
+class CommentEventDispatcherTestCase(SimpleTestCase):
+    def setUp(self):
+        self.dispatcher = CommentEventDispatcher()
+        self.author = User(id=1, username="testuser")
+        patcher = patch.object(self.dispatcher, "_latest_comment_id", return_value=10)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def comment(self, comment_id):
+        return Comment(
+            id=comment_id, post_id=1, author=self.author, content=f"Comment {comment_id}", created_at=timezone.now()
+        )
+
+    def test_fan_out_to_subscribers(self):
+        """Tests that one published comment reaches every subscriber of the post."""
+
+        async def scenario():
+            streams = [self.dispatcher.stream(1), self.dispatcher.stream(1)]
+            for stream in streams:
+                await anext(stream)  # retry hint, sent once subscribed
+            self.dispatcher.publish(self.comment(11))
+            events = [await anext(stream) for stream in streams]
+            for stream in streams:
+                await stream.aclose()
+            return events
+
+        events = asyncio.run(scenario())
+        for event in events:
+            self.assertTrue(event.startswith("id: 11\nevent: comment\n"))
+        self.assertEqual(self.dispatcher._channels, {})
+
+    def test_resume_from_last_event_id(self):
+        """Tests that a resuming client gets the buffered events after its Last-Event-ID."""
+
+        async def scenario():
+            listener = self.dispatcher.stream(1)
+            await anext(listener)
+            self.dispatcher.publish(self.comment(11))
+            self.dispatcher.publish(self.comment(12))
+            resumed = self.dispatcher.stream(1, last_event_id=11)
+            await anext(resumed)
+            event = await anext(resumed)
+            await resumed.aclose()
+            await listener.aclose()
+            return event
+
+        self.assertTrue(asyncio.run(scenario()).startswith("id: 12\n"))
+
+
+class OutboxTestCase(CommonPostAPITestCase):
+    def test_changes_are_recorded_in_outbox(self):
+        """Tests that creating and deleting a comment records outbox events in order."""
+        with patch("posts.routes.check_for_profanity", return_value=False):
+            response = self.client.post(
+                f"/api/posts/{self.post.id}/comments",
+                data={"content": "Outbox comment"},
+                content_type="application/json",
+                headers={"Authorization": f"Bearer {self.access_token}"},
+            )
+        comment_id = response.json()["comment_id"]
+        self.client.delete(
+            f"/api/posts/{self.post.id}/comments/{comment_id}",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+
+        events = list(OutboxEvent.objects.order_by("id"))
+        self.assertEqual([event.topic for event in events], [COMMENT_CREATED, COMMENT_DELETED])
+        self.assertEqual(events[0].payload["content"], "Outbox comment")
+        self.assertEqual(events[1].payload, {"comment_id": comment_id, "post_id": self.post.id})
+
+    def test_relay_to_file_sink(self):
+        """Tests that the relay delivers pending events once, in id order."""
+        first = record_post_created(self.post)
+        second = record_post_deleted(self.post.id)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            target = Path(tmp_dir) / "events.jsonl"
+            call_command("relay_outbox", target=str(target), batch_size=1, stdout=StringIO())
+            call_command("relay_outbox", target=str(target), stdout=StringIO())
+            messages = [json.loads(line) for line in target.read_text().splitlines()]
+
+        self.assertEqual([message["id"] for message in messages], [first.id, second.id])
+        self.assertFalse(OutboxEvent.objects.filter(delivered_at__isnull=True).exists())
+
+    def test_relay_to_http_sink(self):
+        """Tests that the HTTP sink posts batches as JSON and failed batches stay pending."""
+        received = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        record_post_deleted(self.post.id)
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        url = f"http://127.0.0.1:{server.server_port}/events"
+        Thread(target=server.handle_request, daemon=True).start()
+        try:
+            self.assertEqual(relay_outbox(HttpSink(url)), 1)
+        finally:
+            server.server_close()
+        self.assertEqual(received[0][0]["topic"], POST_DELETED)
+
+        record_post_deleted(self.post.id)
+        with self.assertRaises(OSError):
+            relay_outbox(HttpSink(url))
+        self.assertEqual(OutboxEvent.objects.filter(delivered_at__isnull=True).count(), 1)
+
+
+class RemoderationTestCase(CommonPostAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.user, content=content)
+            for content in ("fine", "bad words", "also fine")
+        ]
+
+    def test_batch_check_parses_numbered_verdicts(self):
+        """Tests that one model answer is split into per-text verdicts, with a per-text fallback."""
+        with patch("posts.validators.get_model") as get_model:
+            get_model.return_value.generate_content.return_value.text = "1. No\n2: yes"
+            self.assertEqual(check_for_profanity_batch(["a", "b"]), [False, True])
+
+            get_model.return_value.generate_content.return_value.text = "I cannot tell"
+            with patch("posts.validators.check_for_profanity", return_value=True) as check:
+                self.assertEqual(check_for_profanity_batch(["a", "b"]), [True, True])
+            self.assertEqual(check.call_count, 2)
+
+    def test_remoderate_resumes_from_checkpoint(self):
+        """Tests that an interrupted run resumes after the last checkpointed chunk and reconciles counters."""
+        seen = []
+
+        def moderate(contents):
+            if len(seen) == 1:
+                raise RuntimeError("model unavailable")
+            seen.extend(contents)
+            return ["bad" in content for content in contents]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpoint = Path(tmp_dir) / "checkpoint.json"
+            with patch("posts.moderation.check_for_profanity_batch", side_effect=moderate):
+                with self.assertRaises(RuntimeError):
+                    call_command("remoderate", checkpoint=str(checkpoint), chunk_size=1, stdout=StringIO())
+                self.assertEqual(json.loads(checkpoint.read_text())["processed"], 1)
+
+                seen.append(None)
+                call_command("remoderate", checkpoint=str(checkpoint), chunk_size=1, stdout=StringIO())
+            self.assertFalse(checkpoint.exists())
+
+        self.assertEqual(seen, ["fine", None, "bad words", "also fine"])
+        self.assertEqual(
+            list(Comment.objects.order_by("id").values_list("blocked", flat=True)),
+            [False, True, False],
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.blocked_count, 1)
+
+
+class SpamDetectionTestCase(CommonPostAPITestCase):
+    spam = "Buy cheap watches now at my shop, best prices on luxury watches guaranteed"
+    variant = "buy cheap watches NOW at my store, best prices on luxury watches guaranteed"
+
+    def setUp(self):
+        cache.clear()
+
+    def add_comment(self, content):
+        return self.client.post(
+            f"/api/posts/{self.post.id}/comments",
+            data={"content": content},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.access_token}"},
+        )
+
+    def test_fingerprint_distance(self):
+        """Tests that near-duplicates get close fingerprints and unrelated texts do not."""
+        self.assertLessEqual(hamming_distance(simhash(self.spam), simhash(self.variant)), settings.SPAM_MAX_DISTANCE)
+        self.assertGreater(
+            hamming_distance(simhash(self.spam), simhash("I really enjoyed this post about gardening")),
+            settings.SPAM_MAX_DISTANCE,
+        )
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_near_duplicate_of_blocked_comment_is_rejected(self, mock_check_for_profanity):
+        """Tests that a variant of a blocked comment inherits its verdict without a model call."""
+        other = User.objects.create_user(username="spammer", password="#StrongPass1")
+        Comment.objects.create(post=self.post, author=other, content=self.spam, blocked=True)
+
+        response = self.add_comment(self.variant)
+        self.assertEqual(response.status_code, 400)
+        mock_check_for_profanity.assert_not_called()
+
+    def test_near_duplicate_of_rejected_comment_is_rejected(self):
+        """Tests that a variant of a comment the model rejected is rejected without a model call."""
+        with patch("posts.routes.check_for_profanity", return_value=True):
+            self.assertEqual(self.add_comment(self.spam).status_code, 400)
+        with patch("posts.routes.check_for_profanity", return_value=False) as mock_check_for_profanity:
+            self.assertEqual(self.add_comment(self.variant).status_code, 400)
+        mock_check_for_profanity.assert_not_called()
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_burst_of_near_duplicates_is_throttled(self, mock_check_for_profanity):
+        """Tests that an author posting the same text over and over gets 429."""
+        for _ in range(settings.SPAM_BURST_LIMIT):
+            self.assertEqual(self.add_comment(self.spam).status_code, 200)
+        self.assertEqual(self.add_comment(self.variant).status_code, 429)
+        self.assertEqual(mock_check_for_profanity.call_count, settings.SPAM_BURST_LIMIT)
+        self.assertEqual(self.add_comment("A genuinely different remark").status_code, 200)
+
+    def test_short_texts_skip_spam_rules(self):
+        """Tests that texts too short to fingerprint are neither remembered nor throttled."""
+        with patch("posts.routes.check_for_profanity", return_value=True):
+            self.assertEqual(self.add_comment("!!!").status_code, 400)
+        with patch("posts.routes.check_for_profanity", return_value=False):
+            for _ in range(settings.SPAM_BURST_LIMIT + 1):
+                self.assertEqual(self.add_comment("\U0001f600\U0001f600").status_code, 200)
+            self.assertEqual(self.add_comment("!!!").status_code, 200)
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_fingerprint_is_computed_once(self, _mock_check_for_profanity):
+        """Tests that add_comment hands its fingerprint to the model and saves without content skip SimHash."""
+        with patch("posts.models.content_fingerprint") as model_fingerprint:
+            response = self.add_comment(self.spam)
+            comment = Comment.objects.get(id=response.json()["comment_id"])
+            comment.blocked = True
+            comment.save(update_fields=["blocked"])
+        model_fingerprint.assert_not_called()
+        self.assertEqual(comment.fingerprint, simhash(self.spam))
+
+
+class IdempotencyTestCase(CommonPostAPITestCase):
+    def add_comment(self, content, key="retry-1"):
+        return self.client.post(
+            f"/api/posts/{self.post.id}/comments",
+            data={"content": content},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.access_token}", "Idempotency-Key": key},
+        )
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_retry_replays_first_response(self, mock_check_for_profanity):
+        """Tests that a retried request gets the stored response without running the route again."""
+        first = self.add_comment("Hello")
+        retry = self.add_comment("Hello")
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Comment.objects.count(), 1)
+        mock_check_for_profanity.assert_called_once()
+
+    @patch("posts.routes.check_for_profanity", return_value=True)
+    def test_errors_are_replayed(self, mock_check_for_profanity):
+        """Tests that a rejected request is replayed as rejected instead of moderated again."""
+        self.assertEqual(self.add_comment("Rude").status_code, 400)
+        retry = self.add_comment("Rude")
+        self.assertEqual(retry.status_code, 400)
+        self.assertEqual(retry.json(), {"detail": "Content contains inappropriate language"})
+        mock_check_for_profanity.assert_called_once()
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_key_reused_for_different_request(self, _mock_check_for_profanity):
+        """Tests that reusing a key with a different body is rejected."""
+        self.add_comment("Hello")
+        self.assertEqual(self.add_comment("Something else").status_code, 422)
+
+    def test_concurrent_duplicate_is_rejected_while_in_flight(self):
+        """Tests that a duplicate arriving while the first request is still moderating gets 409."""
+        duplicates = []
+
+        def moderate(content):
+            duplicates.append(self.add_comment("Hello"))
+            return False
+
+        with patch("posts.routes.check_for_profanity", side_effect=moderate):
+            self.assertEqual(self.add_comment("Hello").status_code, 200)
+        self.assertEqual(duplicates[0].status_code, 409)
+        self.assertEqual(Comment.objects.count(), 1)
+
+    @patch("posts.routes.check_for_profanity", return_value=False)
+    def test_purge_expired_keys(self, _mock_check_for_profanity):
+        """Tests that expired keys are purged and can then be reused."""
+        self.add_comment("Hello")
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class PostProjectionTestCase(CommonPostAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = Post.objects.create(author=cls.user, title="Other Post", content="Other Content")
+        cls.comment = Comment.objects.create(post=cls.post, author=cls.user, content="A comment")
+
+    def get(self, url):
+        return self.client.get(url, headers={"Authorization": f"Bearer {self.access_token}"})
+
+    def test_batch_returns_requested_posts_in_order(self):
+        """Tests that the batch endpoint keeps the requested order, skips unknown ids and projects fields."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(f"{self.post_url}batch?ids={self.other.id},999,{self.post.id}&fields=title")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [{"title": "Other Post"}, {"title": "Test Post"}])
+        self.assertNotIn('"content"', queries[-1]["sql"])
+
+    def test_batch_rejects_invalid_input(self):
+        """Tests that malformed ids and unknown fields are rejected."""
+        self.assertEqual(self.get(f"{self.post_url}batch?ids=1,x").status_code, 400)
+        self.assertEqual(self.get(f"{self.post_url}batch?ids=1&fields=password").status_code, 400)
+
+    def test_get_post_with_fields(self):
+        """Tests that get_post returns only the requested fields, and everything without fields."""
+        response = self.get(f"{self.post_url}{self.post.id}?fields=post_id,author")
+        self.assertEqual(
+            response.json(), {"post_id": self.post.id, "author": {"id": self.user.id, "username": self.username}}
+        )
+        full = self.get(f"{self.post_url}{self.post.id}").json()
+        self.assertEqual(full["content"], "Test Content")
+        self.assertIn("last_comment_at", full)
+
+    def test_get_posts_with_fields(self):
+        """Tests that the post list projects fields and keeps its full shape without them."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(f"{self.post_url}?fields=post_id,title")
+        self.assertEqual(
+            sorted(response.json(), key=lambda post: post["post_id"]),
+            [{"post_id": self.post.id, "title": "Test Post"}, {"post_id": self.other.id, "title": "Other Post"}],
+        )
+        self.assertNotIn('"content"', queries[-1]["sql"])
+        full = self.get(self.post_url).json()
+        self.assertEqual(
+            set(full[0]),
+            {
+                "title",
+                "content",
+                "auto_reply_enabled",
+                "reply_delay_minutes",
+                "comment_count",
+                "blocked_count",
+                "last_comment_at",
+            },
+        )
+        self.assertEqual(self.get(f"{self.post_url}?fields=password").status_code, 400)
+
+    def test_feed_with_fields(self):
+        """Tests that the feed projects the items and keeps its order and cursor."""
+        response = self.get(f"{self.post_url}feed?limit=1&fields=title,author")
+        self.assertEqual(
+            response.json(),
+            {
+                "items": [{"title": "Other Post", "author": {"id": self.user.id, "username": self.username}}],
+                "next_cursor": self.other.id,
+            },
+        )
+        last_page = self.get(f"{self.post_url}feed?before={self.other.id}&fields=title").json()
+        self.assertEqual(last_page, {"items": [{"title": "Test Post"}], "next_cursor": None})
+        full = self.get(f"{self.post_url}feed?limit=1").json()
+        self.assertEqual(full["items"][0]["content"], "Other Content")
+        self.assertIn("last_comment_at", full["items"][0])
+
+    def test_get_post_reports_real_author(self):
+        """Tests that the full response, a projection and the batch agree on another user's post author."""
+        author = User.objects.create_user(username="author", password="#StrongPass1")
+        post = Post.objects.create(author=author, title="Their Post", content="Their Content")
+        expected = {"id": author.id, "username": "author"}
+
+        self.assertEqual(self.get(f"{self.post_url}{post.id}").json()["author"], expected)
+        self.assertEqual(self.get(f"{self.post_url}{post.id}?fields=author").json()["author"], expected)
+        self.assertEqual(self.get(f"{self.post_url}batch?ids={post.id}&fields=author").json()[0]["author"], expected)
+
+    def test_get_comments_with_fields(self):
+        """Tests that get_comments projects live and archived comments alike."""
+        ArchivedComment.objects.create(
+            id=self.comment.id + 1000,
+            post_id=self.post.id,
+            author_id=self.user.id,
+            author_username=self.username,
+            content="Archived",
+            created_at=timezone.now(),
+        )
+        response = self.get(f"{self.post_url}{self.post.id}/comments?fields=content,author")
+        self.assertEqual(
+            response.json(),
+            [
+                {"content": "Archived", "author": {"id": self.user.id, "username": self.username}},
+                {"content": "A comment", "author": {"id": self.user.id, "username": self.username}},
+            ],
+        )
+
+
+@override_settings(AUTO_REPLY_POST_CONTEXT_CHARS=100, AUTO_REPLY_POST_CONTEXT_MODE="summarize")
+class AutoReplyPromptTestCase(TestCase):
+    long_post = "Gardening " * 100
+
+    def setUp(self):
+        cache.clear()
+        patcher = patch("posts.utils.get_model")
+        self.model = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+        self.model.generate_content.side_effect = lambda prompt: Mock(
+            text="A short summary" if prompt.startswith("Summarize") else "Thanks!"
+        )
+
+    def prompts(self):
+        return [call.args[0] for call in self.model.generate_content.call_args_list]
+
+    def test_long_post_is_summarized_once(self):
+        """Tests that a long post is summarized once and the summary is reused in every prompt."""
+        generate_auto_reply(self.long_post, "First comment")
+        generate_auto_reply(self.long_post, "Second comment")
+
+        prompts = self.prompts()
+        self.assertEqual(sum(prompt.startswith("Summarize") for prompt in prompts), 1)
+        self.assertEqual(len(prompts), 3)
+        self.assertTrue(all(self.long_post not in prompt for prompt in prompts[1:]))
+
+    def test_summarization_cost_is_not_counted_as_saved(self):
+        """Tests that the one-off summarization request is taken off the tokens saved."""
+        generate_auto_reply(self.long_post, "Comment")
+
+        summary_prompt, reply_prompt = self.prompts()
+        saved_per_reply = len(self.long_post) // 4 - len("A short summary") // 4
+        summarization_cost = len(summary_prompt) // 4 + len("A short summary") // 4
+        self.assertEqual(get_auto_reply_metrics()["tokens_saved"], saved_per_reply - summarization_cost)
+
+    @override_settings(AUTO_REPLY_POST_CONTEXT_MODE="truncate")
+    def test_long_post_is_truncated(self):
+        """Tests that the truncate mode compacts the post without a model call."""
+        generate_auto_reply(self.long_post, "Comment")
+        self.assertEqual(len(self.prompts()), 1)
+        self.assertLess(len(self.prompts()[0]), 200)
+
+    def test_replies_are_cached(self):
+        """Tests that the same post and comment reuse the cached reply and count the tokens saved."""
+        self.assertEqual(generate_auto_reply("Short post", "Comment"), "Thanks!")
+        self.assertEqual(generate_auto_reply("Short post", "Comment"), "Thanks!")
+
+        self.assertEqual(len(self.prompts()), 1)
+        metrics = get_auto_reply_metrics()
+        self.assertEqual((metrics["reply_cache_hits"], metrics["reply_cache_misses"]), (1, 1))
+        self.assertGreater(metrics["tokens_saved"], 0)
+
+        with override_settings(VERTEXAI_MODEL_NAME="another-model"):
+            generate_auto_reply("Short post", "Comment")
+        self.assertEqual(len(self.prompts()), 2)
+
+    def test_stats_command_reads_shared_metrics(self):
+        """Tests that auto_reply_stats reports metrics recorded by another process."""
+        AutoReplyMetric.objects.create(name="reply_cache_hits", value=5)
+        stdout = StringIO()
+        call_command("auto_reply_stats", stdout=stdout)
+        self.assertIn("reply_cache_hits=5", stdout.getvalue())
+
+
+class StartupTestCase(SimpleTestCase):
+    # warmup() opens a connection to every database.
+    databases = "__all__"
+    # Seconds django.setup() plus loading the URLconf may take in a fresh interpreter,
+    # generous by default so that a loaded CI machine does not fail the build.
+    import_time_budget = float(os.environ.get("STARTUP_IMPORT_TIME_BUDGET", "5.0"))
+    # The fastest of a few boots, which filters out a cold disk cache or a busy machine.
+    import_time_runs = 3
+
+    def test_setup_import_time_budget(self):
+        """Tests that booting the project stays within budget and does not import the model SDK."""
+        script = (
+            "import sys, time\n"
+            "started = time.perf_counter()\n"
+            "import django\n"
+            "django.setup()\n"
+            "import main.urls\n"
+            "print(time.perf_counter() - started, 'vertexai' in sys.modules)\n"
+        )
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "main.settings", "SECRET_KEY": "x"}
+        timings = []
+        for _ in range(self.import_time_runs):
+            result = subprocess.run(
+                [sys.executable, "-c", script],
+                cwd=settings.BASE_DIR,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            elapsed, vertexai_imported = result.stdout.split()
+            self.assertEqual(vertexai_imported, "False")
+            timings.append(float(elapsed))
+        self.assertLess(min(timings), self.import_time_budget)
+
+    @patch("posts.warmup.get_model")
+    def test_warmup(self, mock_get_model):
+        """Tests that warmup creates the model client and opens the database connections."""
+        warmup()
+        mock_get_model.assert_called_once()
+        self.assertTrue(all(connections[alias].connection is not None for alias in settings.DATABASES))
+
+    @patch("posts.warmup.connections")
+    @patch("posts.warmup.get_model")
+    def test_warmup_without_connections(self, mock_get_model, mock_connections):
+        """Tests that the ASGI warmup only creates the model client."""
+        warmup(open_connections=False)
+        mock_get_model.assert_called_once()
+        mock_connections.__getitem__.assert_not_called()
+
+
+class AdminChangelistTestCase(CommonPostAPITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.admin = User.objects.create_superuser(username="admin", password="#StrongPass1")
+        cls.comments = [
+            Comment.objects.create(post=cls.post, author=cls.user, content=f"Comment about tomatoes {number} " * 20)
+            for number in range(3)
+        ]
+        cls.changelist_url = reverse("admin:posts_comment_changelist")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_changelist_loads_excerpts_without_exact_count(self):
+        """Tests that the changelist selects related rows, truncates content and skips COUNT(*)."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.changelist_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.comments[0].content[:80] + "...")
+        self.assertNotContains(response, self.comments[0].content)
+        self.assertFalse(any("COUNT(*)" in query["sql"] for query in queries))
+
+        response = self.client.get(
+            self.changelist_url,
+            {"blocked__exact": "1", "created_at__gte": "2020-01-01", "created_at__lt": "2021-01-01"},
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_changelists_do_not_collect_distinct_dates(self):
+        """Tests that the date filters of the changelists do not scan the table for distinct dates."""
+        for url in [self.changelist_url, reverse("admin:posts_post_changelist")]:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, "Past 7 days")
+            for query in queries:
+                self.assertNotIn("DISTINCT", query["sql"])
+                self.assertNotIn("django_datetime_trunc", query["sql"])
+
+    def test_post_changelist_uses_max_id_estimate(self):
+        """Tests that the soft-delete manager's own filter does not make the post list count rows."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin:posts_post_changelist"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries))
+
+    @patch.object(EstimatedCountPaginator, "count_limit", 1)
+    @patch.object(CommentAdmin, "list_per_page", 1)
+    def test_filtered_changelist_pages_stay_reachable(self):
+        """Tests that a filtered list reports a capped count as a lower bound and still reaches the last page."""
+        response = self.client.get(self.changelist_url, {"blocked__exact": "0"})
+        self.assertEqual(str(response.context["cl"].result_count), "2+")
+        self.assertContains(response, "2+")
+
+        response = self.client.get(self.changelist_url, {"blocked__exact": "0", "p": "3"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 3)
+        self.assertEqual(len(response.context["cl"].result_list), 1)
+
+    def test_search_uses_full_text_index(self):
+        """Tests that changelist search goes through the search backend."""
+        with patch("posts.admin.get_search_backend", wraps=get_search_backend) as mock_backend:
+            response = self.client.get(self.changelist_url, {"q": "tomatoes"})
+        mock_backend.assert_called_once()
+        self.assertEqual(len(response.context["cl"].result_list), 3)
+
+    def test_search_finds_blocked_comments(self):
+        """Tests that moderators find blocked comments, which the public search hides."""
+        self.client.post(self.changelist_url, {"action": "block_comments", "_selected_action": [self.comments[0].id]})
+
+        response = self.client.get(self.changelist_url, {"q": "tomatoes"})
+        self.assertEqual(len(response.context["cl"].result_list), 3)
+        hits, _ = get_search_backend().search("tomatoes", 10)
+        self.assertNotIn(self.comments[0].id, [hit["id"] for hit in hits if hit["type"] == "comment"])
+
+    def test_block_and_unblock_actions(self):
+        """Tests that the moderation actions update the selection and the post counters."""
+        selection = [comment.id for comment in self.comments[:2]]
+        self.client.post(self.changelist_url, {"action": "block_comments", "_selected_action": selection})
+        self.assertEqual(Comment.objects.filter(blocked=True).count(), 2)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.blocked_count, 2)
+
+        self.client.post(self.changelist_url, {"action": "unblock_comments", "_selected_action": selection[:1]})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.blocked_count, 1)
@@ -1,13 +1,107 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 
 from .ai_model import get_model
-from .models import Comment, Post
+from .counters import increment_comment_counters
+from .events import comment_events
+from .models import AutoReplyMetric, Comment, Post
+from .outbox import record_comment_created
+from .sharding import comment_transaction
+
+# Bump when the prompts change, so cached contexts and replies are not reused.
+PROMPT_VERSION = 1
+AUTO_REPLY_METRICS = ["reply_cache_hits", "reply_cache_misses", "tokens_saved"]
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough count for bookkeeping; Gemini averages about four characters per token.
+    return len(text) // 4
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _cache_key(kind: str, *texts: str) -> str:
+    digests = ":".join(_digest(text) for text in texts)
+    return f"auto_reply:{kind}:v{PROMPT_VERSION}:{settings.VERTEXAI_MODEL_NAME}:{digests}"
+
+
+def record_auto_reply_metric(name: str, value: int = 1):
+    metrics = AutoReplyMetric.objects.filter(name=name)
+    if not metrics.update(value=F("value") + value):
+        AutoReplyMetric.objects.get_or_create(name=name)
+        metrics.update(value=F("value") + value)
+
+
+def get_auto_reply_metrics() -> dict:
+    values = dict(AutoReplyMetric.objects.filter(name__in=AUTO_REPLY_METRICS).values_list("name", "value"))
+    return {name: values.get(name, 0) for name in AUTO_REPLY_METRICS}
+
+
+def truncate_content(content: str, limit: int) -> str:
+    if len(content) <= limit:
+        return content
+    return content[:limit].rsplit(" ", 1)[0] + "..."
+
+
+def post_context(post_content: str) -> str:
+    """
+    The version of a post embedded in auto-reply prompts: the content itself when
+    short, otherwise a summary (or a truncation, per AUTO_REPLY_POST_CONTEXT_MODE)
+    computed once per post content and model and reused for every comment. The
+    summarization request sends the whole post, so its tokens are taken off the
+    tokens_saved metric.
+    """
+    limit = settings.AUTO_REPLY_POST_CONTEXT_CHARS
+    if len(post_content) <= limit:
+        return post_content
+    key = _cache_key("context", post_content)
+    context = cache.get(key)
+    if context is None:
+        if settings.AUTO_REPLY_POST_CONTEXT_MODE == "summarize":
+            prompt = (
+                f"Summarize the following post in at most {limit // 6} words, keeping its main points: {post_content}"
+            )
+            response = get_model().generate_content(prompt)
+            record_auto_reply_metric("tokens_saved", -(estimate_tokens(prompt) + estimate_tokens(response.text)))
+            context = truncate_content(response.text.strip(), limit)
+        else:
+            context = truncate_content(post_content, limit)
+        cache.set(key, context, settings.AUTO_REPLY_CACHE_SECONDS)
+    return context
+
+
+def build_reply_prompt(context: str, comment_content: str) -> str:
+    return f"Generate a relevant reply for a comment '{comment_content}' on the post '{context}'."
 
 
 def generate_auto_reply(post_content: str, comment_content: str) -> str:
-    prompt = f"Generate a relevant reply for a comment '{comment_content}' on the post '{post_content}'."
-    response = get_model().generate_content(prompt)
-    return response.text
+    """
+    Generates a reply to a comment, reusing the cached reply for the same post and
+    comment content and model. Tokens kept out of requests by the compacted post
+    context and by cache hits are added to the tokens_saved metric.
+    """
+    context = post_context(post_content)
+    prompt = build_reply_prompt(context, comment_content)
+    saved = estimate_tokens(post_content) - estimate_tokens(context)
+
+    key = _cache_key("reply", post_content, comment_content)
+    reply = cache.get(key)
+    if reply is None:
+        record_auto_reply_metric("reply_cache_misses")
+        reply = get_model().generate_content(prompt).text
+        cache.set(key, reply, settings.AUTO_REPLY_CACHE_SECONDS)
+    else:
+        record_auto_reply_metric("reply_cache_hits")
+        saved += estimate_tokens(prompt) + estimate_tokens(reply)
+    record_auto_reply_metric("tokens_saved", saved)
+    return reply
 
 
 def auto_reply(request, post_id: int):
@@ -16,4 +110,13 @@ def auto_reply(request, post_id: int):
 
     for comment in comments:
         reply_content = generate_auto_reply(post.content, comment.content)
-        Comment.objects.create(post=post, author=request.auth, content=reply_content, is_auto_reply=True)
+        with comment_transaction(post.id):
+            reply = post.comments.create(
+                author=request.auth,
+                parent=comment if comment.depth < Comment.MAX_DEPTH else comment.parent,
+                content=reply_content,
+                is_auto_reply=True,
+            )
+            increment_comment_counters(reply)
+            record_comment_created(reply)
+            transaction.on_commit(lambda reply=reply: comment_events.publish(reply))
@@ -1,4 +1,7 @@
+import json
+import re
 from datetime import date, datetime
+from typing import List
 
 from ninja.errors import HttpError
 
@@ -15,6 +18,27 @@ def check_for_profanity(content: str) -> bool:
     return "yes" in response.text.lower()
 
 
+def check_for_profanity_batch(contents: List[str]) -> List[bool]:
+    """
+    Checks several texts with a single model request. Falls back to one request per
+    text when the answer cannot be matched to the numbered texts.
+    """
+    texts = "\n".join(f"{number}. {json.dumps(content)}" for number, content in enumerate(contents, 1))
+    response = get_model().generate_content(
+        "For each numbered text below, answer on its own line with the number followed by yes or no: "
+        f"does the text contain offensive or inappropriate language?\n{texts}"
+    )
+    verdicts = {}
+    for line in response.text.splitlines():
+        match = re.match(r"\W*(\d+)\W+(yes|no)\b", line, re.IGNORECASE)
+        if match:
+            verdicts[int(match[1])] = match[2].lower() == "yes"
+    numbers = range(1, len(contents) + 1)
+    if set(verdicts) != set(numbers):
+        return [check_for_profanity(content) for content in contents]
+    return [verdicts[number] for number in numbers]
+
+
 def validate_and_parse_date(date_str: str) -> date:
     """
     Helper function to validate and parse date strings in the format YYYY-MM-DD
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import connections
+
+from .ai_model import get_model
+
+
+def warmup(open_connections: bool = True):
+    """
+    Pays the one-off startup costs of a worker before its first request: imports
+    the model SDK and creates the client, and opens the database connections of
+    the current thread (with their PRAGMAs applied). Called from main.wsgi and
+    main.asgi when WORKER_WARMUP is set.
+
+    Connections belong to the thread and process that opened them, so this must run
+    in the worker after the fork (not in a `gunicorn --preload` master), and
+    main.asgi skips them because requests run on other threads.
+    """
+    get_model()
+    if open_connections:
+        for alias in settings.DATABASES:
+            connections[alias].ensure_connection()
@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2 with the iteration count of PASSWORD_PBKDF2_ITERATIONS, chosen with
+    benchmark_password_hashers. Existing pbkdf2_sha256 hashes keep verifying with
+    the iterations stored in them and are re-hashed on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+PASSWORD = "#BenchmarkPass1"
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the cost of hashing one password with the preferred hasher of every "
+        "PASSWORD_HASHER_PROFILES entry and with PBKDF2 at several iteration counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=5)
+        parser.add_argument("--iterations", type=int, nargs="*", default=[260000, 600000, 870000])
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"active profile: {settings.PASSWORD_HASHER_PROFILE}")
+        for profile, hashers in settings.PASSWORD_HASHER_PROFILES.items():
+            hasher = import_string(hashers[0])()
+            try:
+                self.report(profile, lambda hasher=hasher: hasher.encode(PASSWORD, hasher.salt()), options["rounds"])
+            except ValueError as error:
+                # Hashers backed by optional libraries (argon2-cffi, bcrypt) may be missing.
+                self.stdout.write(f"{profile:<24} unavailable: {error}")
+        pbkdf2 = PBKDF2PasswordHasher()
+        for iterations in options["iterations"]:
+            self.report(
+                f"pbkdf2 x{iterations}",
+                lambda iterations=iterations: pbkdf2.encode(PASSWORD, pbkdf2.salt(), iterations=iterations),
+                options["rounds"],
+            )
+
+    def report(self, name, encode, rounds):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            encode()
+        per_hash = (time.perf_counter() - started) / rounds
+        self.stdout.write(f"{name:<24} {per_hash * 1000:>8.1f} ms/hash {1 / per_hash:>8.1f} hashes/s per core")
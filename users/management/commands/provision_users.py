@@ -0,0 +1,39 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.provisioning import provision_users
+
+
+class Command(BaseCommand):
+    help = "Bulk-creates user accounts from a CSV file with username and password columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--workers", type=int, default=None, help="Hashing processes, one per core by default.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with open(options["path"], newline="", encoding="utf-8") as file:
+            reader = csv.DictReader(file)
+            if not {"username", "password"} <= set(reader.fieldnames or []):
+                raise CommandError("The file needs a header with username and password columns")
+            accounts = [(row["username"], row["password"]) for row in reader]
+
+        started = time.perf_counter()
+        result = provision_users(accounts, workers=options["workers"], batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+
+        for username in result["duplicates"]:
+            self.stderr.write(f"{username}: repeated in the file, only the first row was used")
+        for username, errors in result["invalid"].items():
+            self.stderr.write(f"{username}: {' '.join(errors)}")
+        created = result["created"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {created} of {len(accounts)} user(s) in {elapsed:.1f}s ({created / max(elapsed, 1e-9):.1f}/s); "
+                f"skipped {result['taken']} taken, {len(result['duplicates'])} duplicate "
+                f"and {len(result['invalid'])} invalid"
+            )
+        )
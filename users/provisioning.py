@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Tuple
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+
+
+def _init_worker():
+    # Forked workers inherit the configured project; spawned ones have to set it up.
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_account(account: Tuple[str, str]) -> Tuple[Optional[str], List[str]]:
+    """
+    Validates a password the way registration does and hashes it. Returns the hash,
+    or None and the validation messages.
+    """
+    username, password = account
+    try:
+        validate_password(password, User(username=username))
+    except ValidationError as error:
+        return None, error.messages
+    return make_password(password), []
+
+
+def provision_users(accounts: Iterable[Tuple[str, str]], workers: int = None, batch_size: int = 1000) -> dict:
+    """
+    Creates accounts from (username, password) pairs in batches, skipping taken
+    usernames, repeated usernames (the first row wins) and passwords the
+    AUTH_PASSWORD_VALIDATORS reject. Passwords are validated and hashed on a pool of
+    processes so hashing uses every core, and each batch is inserted with one
+    bulk_create.
+    Returns the number of created users, the number of taken usernames, and the
+    duplicate and invalid rows.
+    """
+    passwords = {}
+    duplicates = []
+    for username, password in accounts:
+        if username in passwords:
+            duplicates.append(username)
+        else:
+            passwords[username] = password
+    usernames = list(passwords)
+    result = {"created": 0, "taken": 0, "duplicates": duplicates, "invalid": {}}
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(batch_size // (workers * 4), 1)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        for start in range(0, len(usernames), batch_size):
+            batch = usernames[start : start + batch_size]
+            taken = set(User.objects.filter(username__in=batch).values_list("username", flat=True))
+            result["taken"] += len(taken)
+            batch = [username for username in batch if username not in taken]
+            if not batch:
+                continue
+            hashed = executor.map(
+                _hash_account, [(username, passwords[username]) for username in batch], chunksize=chunksize
+            )
+            users = []
+            for username, (password, errors) in zip(batch, hashed, strict=True):
+                if errors:
+                    result["invalid"][username] = errors
+                else:
+                    users.append(User(username=username, password=password))
+            # ignore_conflicts covers usernames registered while the batch was being hashed.
+            User.objects.bulk_create(users, ignore_conflicts=True)
+            # Salted hashes are unique, so only the rows inserted here carry them.
+            inserted = User.objects.filter(
+                username__in=[user.username for user in users], password__in=[user.password for user in users]
+            ).count()
+            result["created"] += inserted
+            result["taken"] += len(users) - inserted
+    return result
@@ -1,5 +1,6 @@
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from django.db import IntegrityError, transaction
 from ninja import Router
 from ninja.errors import HttpError
 from ninja_extra import api_controller
@@ -12,11 +13,13 @@ router = Router(tags=["user"])
 
 @router.post("/register")
 def register(request, payload: RegisterSchema):
-    if User.objects.filter(username=payload.username).exists():
-        raise HttpError(400, "Username already taken")
-
     validate_password(payload.password)
-    User.objects.create_user(username=payload.username, password=payload.password)
+    # The unique username constraint detects taken names, without a separate lookup.
+    try:
+        with transaction.atomic():
+            User.objects.create_user(username=payload.username, password=payload.password)
+    except IntegrityError:
+        raise HttpError(400, "Username already taken") from None
     return {"status": "OK"}
 
 
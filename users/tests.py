@@ -1,7 +1,15 @@
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from ninja.testing.client import TestClient
 
+from .provisioning import provision_users
 from .routes import router
 
 
@@ -81,3 +89,49 @@ class UserAPITestCase(TestCase):
         json_response = response.json()
         self.assertIn("detail", json_response)
         self.assertEqual(json_response["detail"], "No active account found with the given credentials")
+
+
+class UserProvisioningTestCase(TestCase):
+    def test_provision_users_from_csv(self):
+        """Tests that accounts are bulk-created with hashed passwords and taken usernames are skipped."""
+        User.objects.create_user(username="taken", password="#StrongPass1")
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+            file.write("username,password\nalice,#AlicePass1\nbob,#BobPass1\ntaken,#Other1\n")
+        self.addCleanup(os.unlink, file.name)
+
+        out = StringIO()
+        call_command("provision_users", file.name, workers=2, stdout=out)
+
+        self.assertIn("Created 2 of 3 user(s)", out.getvalue())
+        self.assertTrue(User.objects.get(username="alice").check_password("#AlicePass1"))
+        self.assertTrue(User.objects.get(username="taken").check_password("#StrongPass1"))
+
+    def test_provision_users_reports_duplicates_and_invalid_passwords(self):
+        """Tests that repeated usernames and passwords failing validation are reported, not created."""
+        accounts = [("carol", "#CarolPass1"), ("carol", "#Other1"), ("dave", "123")]
+        result = provision_users(accounts, workers=1)
+
+        self.assertEqual(result["created"], 1)
+        self.assertEqual(result["duplicates"], ["carol"])
+        self.assertEqual(list(result["invalid"]), ["dave"])
+        self.assertTrue(User.objects.get(username="carol").check_password("#CarolPass1"))
+        self.assertFalse(User.objects.filter(username="dave").exists())
+
+    def test_provision_users_counts_only_inserted_rows(self):
+        """Tests that a username registered while its batch was hashed is counted as taken, not created."""
+        bulk_create = User.objects.bulk_create
+
+        def register_first(users, **kwargs):
+            User.objects.create_user(username="erin", password="#ErinPass1")
+            return bulk_create(users, **kwargs)
+
+        with patch.object(User.objects, "bulk_create", side_effect=register_first):
+            result = provision_users([("erin", "#Provisioned1"), ("frank", "#FrankPass1")], workers=1)
+
+        self.assertEqual((result["created"], result["taken"]), (1, 1))
+        self.assertTrue(User.objects.get(username="erin").check_password("#ErinPass1"))
+
+    @override_settings(PASSWORD_HASHERS=["users.hashers.TunedPBKDF2PasswordHasher"], PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_tuned_pbkdf2_hasher(self):
+        """Tests that the tuned hasher uses the configured iteration count."""
+        self.assertTrue(make_password("#StrongPass1").startswith("pbkdf2_sha256$1000$"))